@@ -1,6 +1,8 @@
 # flake8: noqa
 from floppyforms import *
 
+import sys
+
 import django
 
 if django.VERSION < (1, 6):
@@ -9,3 +11,17 @@ if django.VERSION < (1, 6):
                   "django 1.6+")
 else:
     from .models import *
+
+if sys.version_info >= (3, 7):
+    import importlib
+
+    def __getattr__(name):
+        # Mirrors the lazy import of floppyforms.gis in floppyforms/__init__.py
+        if name == 'gis':
+            try:
+                return importlib.import_module('floppyforms.gis')
+            except Exception as e:
+                raise AttributeError(
+                    'floppyforms.gis is not available: %s' % e) from e
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
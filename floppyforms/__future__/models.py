@@ -1,7 +1,12 @@
 # flake8: noqa
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
 import django
+from django.core.signals import setting_changed
 from django.db import models as db_models
+from django.db.models.signals import class_prepared
 from django.forms.models import (ModelForm as _ModelForm,
                                  ModelFormMetaclass as _ModelFormMetaclass,
                                  modelform_factory as _modelform_factory,
@@ -20,7 +25,8 @@ __all__ = (
     'ModelForm', 'BaseModelForm', 'model_to_dict', 'fields_for_model',
     'ModelChoiceField', 'ModelMultipleChoiceField',
     'BaseModelFormSet', 'modelformset_factory', 'BaseInlineFormSet',
-    'inlineformset_factory',
+    'inlineformset_factory', 'cached_modelform_factory',
+    'cached_modelformset_factory',
 )
 
 if django.VERSION > (1, 7):
@@ -66,8 +72,30 @@ for value in FORMFIELD_OVERRIDES.values():
     value['choices_form_class'] = fields.TypedChoiceField
 
 
+@lru_cache(maxsize=None)
+def get_formfield_overrides(field_class):
+    """
+    Returns the ``FORMFIELD_OVERRIDES`` entry for the model field class
+    ``field_class``, following its MRO so that subclasses of e.g.
+    ``models.CharField`` get a floppyforms field as well.
+
+    A subclass that implements its own ``formfield()`` is left alone, as it
+    may choose its own form field class.
+
+    The result is cached per class, call
+    ``get_formfield_overrides.cache_clear()`` after changing
+    ``FORMFIELD_OVERRIDES``.
+    """
+    for class_ in field_class.__mro__:
+        if class_ in FORMFIELD_OVERRIDES:
+            return FORMFIELD_OVERRIDES[class_]
+        if 'formfield' in vars(class_):
+            break
+    return {}
+
+
 def formfield_callback(db_field, **kwargs):
-    defaults = FORMFIELD_OVERRIDES.get(db_field.__class__, {}).copy()
+    defaults = get_formfield_overrides(db_field.__class__).copy()
     defaults.update(kwargs)
     return db_field.formfield(**defaults)
 
@@ -106,3 +134,85 @@ def inlineformset_factory(parent_model, model, form=ModelForm,
                                   fields, exclude, extra, can_order,
                                   can_delete, max_num, formfield_callback,
                                   *args, **kwargs)
+
+
+class _DictMarker(object):
+    pass
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return (_DictMarker,) + tuple(sorted(
+            (key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class FactoryCache(object):
+    """
+    A bounded LRU cache for the classes built by the model form factories,
+    keyed on the factory and its arguments. Calls with arguments that can't
+    be hashed are not cached.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.classes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_create(self, factory, args, kwargs):
+        try:
+            key = (factory, _freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            return factory(*args, **kwargs)
+        with self.lock:
+            if key in self.classes:
+                self.classes.move_to_end(key)
+                return self.classes[key]
+        class_ = factory(*args, **kwargs)
+        with self.lock:
+            self.classes[key] = class_
+            while len(self.classes) > self.maxsize:
+                self.classes.popitem(last=False)
+        return class_
+
+    def clear(self):
+        with self.lock:
+            self.classes.clear()
+
+
+factory_cache = FactoryCache()
+
+
+def cached_modelform_factory(model, *args, **kwargs):
+    """
+    Like ``modelform_factory``, but returns the same class for the same
+    arguments. Don't modify the returned class, e.g. by changing the
+    ``queryset`` of its ``base_fields``, as it is shared between callers.
+    """
+    return factory_cache.get_or_create(modelform_factory, (model,) + args,
+                                       kwargs)
+
+
+def cached_modelformset_factory(model, *args, **kwargs):
+    """
+    Like ``modelformset_factory``, but returns the same class for the same
+    arguments. See ``cached_modelform_factory``.
+    """
+    return factory_cache.get_or_create(modelformset_factory,
+                                       (model,) + args, kwargs)
+
+
+def clear_factory_cache(**kwargs):
+    factory_cache.clear()
+
+
+def clear_factory_cache_on_setting_change(setting, **kwargs):
+    if setting == 'INSTALLED_APPS':
+        factory_cache.clear()
+
+
+# New or reloaded models invalidate the cached form classes.
+class_prepared.connect(clear_factory_cache)
+setting_changed.connect(clear_factory_cache_on_setting_change)
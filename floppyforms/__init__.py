@@ -1,4 +1,6 @@
 # flake8: noqa
+import sys
+
 from django.forms import (BaseModelForm, model_to_dict, fields_for_model,
                           ValidationError, Media, MediaDefiningClass)
 
@@ -13,11 +15,32 @@ try:
 except ImportError:
     pass
 
-try:
-    from . import gis
-except Exception:
-    import warnings
-    warnings.warn(
-        "Unable to import floppyforms.gis, geometry widgets not available")
+if sys.version_info < (3, 7):
+    # No module level __getattr__ (PEP 562), import floppyforms.gis eagerly.
+    try:
+        from . import gis
+    except Exception:
+        import warnings
+        warnings.warn(
+            "Unable to import floppyforms.gis, geometry widgets not available")
+else:
+    import importlib
+
+    def __getattr__(name):
+        # floppyforms.gis loads the GDAL and GEOS libraries, so it is only
+        # imported when it's used.
+        if name == 'gis':
+            # Not ``from . import gis``, which looks the attribute up on
+            # this module again and recurses.
+            try:
+                return importlib.import_module('.gis', __name__)
+            except Exception as e:
+                # Without GDAL / GEOS, hasattr() must return False rather
+                # than raise. ``import floppyforms.gis`` raises the original
+                # error.
+                raise AttributeError(
+                    'floppyforms.gis is not available: %s' % e) from e
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
 
 __version__ = '1.9.0'
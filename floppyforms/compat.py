@@ -1,8 +1,12 @@
+import os
 from contextlib import contextmanager
 
 import django
-from django.template import Context
+from django.core.signals import setting_changed
+from django.template import Context, TemplateDoesNotExist, engines
+from django.template.loaders.cached import Loader as CachedLoader
 from django.utils.datastructures import MultiValueDict
+from django.utils.safestring import mark_safe
 
 MULTIVALUE_DICT_TYPES = (MultiValueDict,)
 
@@ -19,6 +23,10 @@ class DictContext(dict):
     pass
 
 
+def is_jinja2_context(context):
+    return getattr(context, 'environment', None) is not None
+
+
 if django.VERSION < (1, 8):
     def get_template(context, template_name):
         from django.template.loader import get_template
@@ -36,6 +44,9 @@ else:
         # Django 1.8 and higher support multiple template engines. We need to
         # load child templates used in the floppyform template tags from the
         # same engine. Otherwise this might get really confusing.
+        if is_jinja2_context(context):
+            # See floppyforms.jinja2ext.
+            return context.environment.get_template(template_name)
         return context.template.engine.get_template(template_name)
 
     def get_context(context):
@@ -49,6 +60,8 @@ def flatten_context(context):
         for d in context.dicts:
             flat.update(d)
         return flat
+    elif is_jinja2_context(context):
+        return context.get_all()
     else:
         return context
 
@@ -66,6 +79,111 @@ def flatten_contexts(*contexts):
     return new_context
 
 
+def is_jinja2_engine(engine):
+    try:
+        from django.template.backends.jinja2 import Jinja2
+    except ImportError:
+        return False
+    return isinstance(engine, Jinja2)
+
+
+def find_template(template_name):
+    """
+    Loads ``template_name``, or the first template of a list of names, for
+    forms and widgets rendered outside of the Jinja2 template tags. Like
+    ``django.template.loader.select_template()``, but the Jinja2 backends
+    are only tried if no other backend has the template, so that the
+    templates bundled in ``floppyforms/jinja2/`` don't shadow a project's
+    overrides of the Django templates.
+    """
+    if isinstance(template_name, str):
+        template_name = [template_name]
+    jinja2_engines = []
+    other_engines = []
+    for engine in engines.all():
+        if is_jinja2_engine(engine):
+            jinja2_engines.append(engine)
+        else:
+            other_engines.append(engine)
+    chain = []
+    for group in (other_engines, jinja2_engines):
+        for name in template_name:
+            for engine in group:
+                try:
+                    return engine.get_template(name)
+                except TemplateDoesNotExist as e:
+                    chain.append(e)
+    raise TemplateDoesNotExist(', '.join(template_name), chain=chain)
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Whether a template found by find_template() is one of the bundled
+# templates, keyed on the template name. Only templates loaded by the cached
+# template loader are memoised, other loaders pick up changes to the
+# templates.
+bundled_templates = {}
+
+
+def clear_bundled_templates(**kwargs):
+    bundled_templates.clear()
+
+
+setting_changed.connect(clear_bundled_templates)
+
+
+def is_bundled_path(path):
+    # Templates that aren't loaded from a file have a relative name.
+    return bool(path) and os.path.isabs(path) and os.path.abspath(
+        path).startswith(PACKAGE_DIR + os.sep)
+
+
+def get_template_engine(template):
+    """
+    Returns the ``django.template.Engine`` of a template loaded by the Django
+    template backend, or ``None`` for other backends.
+    """
+    return getattr(getattr(template, 'template', None), 'engine', None)
+
+
+def uses_cached_loader(engine):
+    return engine is not None and any(
+        isinstance(loader, CachedLoader) for loader in engine.template_loaders)
+
+
+def is_bundled_template(template_name):
+    """
+    Tells whether ``find_template(template_name)`` finds the template bundled
+    with floppyforms, i.e. it isn't overridden by the project.
+    """
+    try:
+        return bundled_templates[template_name]
+    except KeyError:
+        pass
+    try:
+        template = find_template(template_name)
+    except TemplateDoesNotExist:
+        return False
+    bundled = is_bundled_path(getattr(template.origin, 'name', None))
+    if uses_cached_loader(get_template_engine(template)):
+        bundled_templates[template_name] = bundled
+    return bundled
+
+
+def render_to_string(template_name, context, context_instance=None):
+    """
+    Renders ``template_name`` with the engine ``context_instance`` belongs
+    to: a widget rendered by the Jinja2 template tags uses the Jinja2
+    templates, otherwise ``find_template()`` picks the engine.
+
+    The result is marked safe, Jinja2 templates return plain strings.
+    """
+    if is_jinja2_context(context_instance):
+        template = context_instance.environment.get_template(template_name)
+        return mark_safe(template.render(context))
+    return mark_safe(find_template(template_name).render(context))
+
+
 @contextmanager
 def render_context(context_instance, context):
     if context_instance is not None:
@@ -1,7 +1,11 @@
 from django import forms
-from django.template.loader import get_template
+from django.template import TemplateDoesNotExist
+from django.utils.safestring import mark_safe
 
-from .compat import get_context
+from .compat import (find_template, get_context, get_template_engine,
+                     is_bundled_template)
+from .templatetags.floppyforms import (BaseFormNode, FormConfig,
+                                       memoize_hidden_field_errors)
 
 
 __all__ = ('BaseForm', 'Form',)
@@ -11,12 +15,38 @@ class LayoutRenderer(object):
     _render_as_template_name = 'floppyforms/_render_as.html'
 
     def _render_as(self, layout):
-        template_node = get_template(self._render_as_template_name)
+        # The bundled _render_as.html only renders the form with the layout,
+        # which is done here without loading it. Templates overridden by a
+        # project are still rendered.
+        if not is_bundled_template(self._render_as_template_name):
+            template_node = find_template(self._render_as_template_name)
+            context = get_context({
+                'form': self,
+                'layout': layout,
+            })
+            # Jinja2 templates don't return safe strings.
+            return mark_safe(template_node.render(context))
+
+        try:
+            template_node = find_template(layout)
+        except TemplateDoesNotExist:
+            # The {% form %} tag of _render_as.html renders nothing for a
+            # missing layout unless its engine has template debugging on.
+            engine = get_template_engine(
+                find_template(self._render_as_template_name))
+            if engine is None or engine.debug:
+                raise
+            return mark_safe('')
         context = get_context({
             'form': self,
-            'layout': layout,
+            'forms': [self],
+            BaseFormNode.IN_FORM_CONTEXT_VAR: True,
+            # The Jinja2 tags look the configuration up in the context, the
+            # Django tags add it to the context on first use.
+            BaseFormNode.CONFIG_CONTEXT_ATTR: FormConfig(),
         })
-        return template_node.render(context)
+        with memoize_hidden_field_errors():
+            return mark_safe(template_node.render(context))
 
     def __str__(self):
         return self._render_as('floppyforms/layouts/default.html')
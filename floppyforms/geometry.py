@@ -0,0 +1,77 @@
+"""
+Helpers of the ``floppyforms.gis`` widgets that don't need GDAL or GEOS.
+"""
+import base64
+import hashlib
+import re
+import zlib
+
+__all__ = ('parse_wkt_header', 'pack_full_value', 'unpack_full_value')
+
+
+# Matches the header of a WKT or EWKT string, e.g. 'SRID=4326;POLYGON Z ('.
+WKT_HEADER_RE = re.compile(
+    r'^\s*(?:SRID=(?P<srid>\d+)\s*;\s*)?'
+    r'(?P<geom_type>GEOMETRYCOLLECTION|MULTIPOINT|MULTILINESTRING|'
+    r'MULTIPOLYGON|POINT|LINESTRING|LINEARRING|POLYGON)\b'
+    r'\s*(?:ZM|Z|M)?\s*(?:(?P<empty>EMPTY\b)|\()', re.IGNORECASE)
+
+
+def parse_wkt_header(value):
+    """
+    Reads the SRID and the geometry type from the header of a WKT or EWKT
+    string. Returns a ``(srid, geom_type, wkt)`` tuple where ``srid`` is
+    ``None`` for plain WKT and ``wkt`` is the string without its
+    ``SRID=...;`` prefix, or ``None`` if ``value`` doesn't start with a WKT
+    header. ``wkt`` is empty for empty geometries.
+
+    Only the header is read, the coordinates are neither parsed nor checked.
+    """
+    match = WKT_HEADER_RE.match(value)
+    if match is None:
+        return None
+    srid = match.group('srid')
+    if srid is not None:
+        srid = int(srid)
+    geom_type = match.group('geom_type').upper()
+    if match.group('empty'):
+        if value[match.end():].strip():
+            return None
+        wkt = ''
+    else:
+        wkt = value[match.start('geom_type'):].rstrip()
+    return srid, geom_type, wkt
+
+
+def get_value_digest(value):
+    return hashlib.sha1(value.strip().encode('utf-8')).hexdigest()
+
+
+def pack_full_value(value, ewkb):
+    """
+    Returns the value of the hidden input that holds the full precision
+    geometry ``ewkb`` of a simplified geometry, displayed as ``value``. It's
+    the compressed, base64 encoded EWKB prefixed with a digest of ``value``.
+    """
+    data = base64.b64encode(zlib.compress(bytes(ewkb))).decode('ascii')
+    return '%s:%s' % (get_value_digest(value), data)
+
+
+def unpack_full_value(full_value, value, max_size):
+    """
+    Returns the EWKB packed by ``pack_full_value()``, or ``None`` if it can't
+    be decoded, if it's larger than ``max_size`` bytes or if the simplified
+    geometry was edited, i.e. ``value`` isn't what was displayed.
+    """
+    digest, sep, data = full_value.partition(':')
+    if not sep or digest != get_value_digest(value):
+        return None
+    decompressor = zlib.decompressobj()
+    try:
+        ewkb = decompressor.decompress(base64.b64decode(data), max_size)
+    except (ValueError, TypeError, zlib.error):
+        return None
+    # Truncated, or larger than max_size.
+    if not decompressor.eof:
+        return None
+    return ewkb
@@ -1,8 +1,17 @@
+import base64
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
 from django.conf import settings
+from django.core.signals import setting_changed
 from django.template.defaultfilters import safe
 from django.utils import translation
 
 import floppyforms as forms
+from floppyforms.geometry import (parse_wkt_header, pack_full_value,
+                                  unpack_full_value)
 
 from urllib.parse import urlencode
 
@@ -17,7 +26,122 @@ __all__ = ('GeometryWidget', 'GeometryCollectionWidget',
            'LineStringWidget', 'MultiLineStringWidget',
            'PolygonWidget', 'MultiPolygonWidget',
            'BaseGeometryWidget', 'BaseMetacartaWidget',
-           'BaseOsmWidget', 'BaseGMapWidget')
+           'BaseOsmWidget', 'BaseGMapWidget', 'GeometryCache',
+           'TransformCache')
+
+
+class GeometryCache(object):
+    """
+    A thread-safe LRU cache of strings computed from geometries, or of tuples
+    of such strings. The least recently used values are evicted once their
+    total length exceeds ``maxbytes``.
+    """
+    def __init__(self, maxbytes=8 * 1024 * 1024):
+        self.maxbytes = maxbytes
+        self.currbytes = 0
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_size(self, value):
+        if isinstance(value, str):
+            return len(value)
+        return sum(len(item) for item in value if item)
+
+    def get(self, key):
+        """
+        Returns the value cached for ``key``, or ``None``.
+        """
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                return self.data[key]
+        return None
+
+    def add(self, key, value):
+        size = self.get_size(value)
+        if size > self.maxbytes:
+            return
+        with self.lock:
+            if key in self.data:
+                return
+            self.data[key] = value
+            self.currbytes += size
+            while self.currbytes > self.maxbytes:
+                __, evicted = self.data.popitem(last=False)
+                self.currbytes -= self.get_size(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.currbytes = 0
+
+
+class TransformCache(GeometryCache):
+    """
+    A ``GeometryCache`` of reprojected geometries, keyed on a hash of the
+    geometry's WKB and the source and target SRIDs. The cached values are
+    WKT strings.
+    """
+    def get_key(self, geometry, srid):
+        digest = hashlib.sha1(geometry.wkb).digest()
+        return (digest, geometry.srid, srid)
+
+    def transform(self, geometry, srid):
+        """
+        Returns the WKT of ``geometry`` transformed to ``srid``. Raises
+        ``GDALException`` if the transformation fails.
+        """
+        key = self.get_key(geometry, srid)
+        wkt = self.get(key)
+        if wkt is not None:
+            return wkt
+        ogr = geometry.ogr
+        ogr.transform(srid)
+        wkt = ogr.wkt
+        self.add(key, wkt)
+        return wkt
+
+
+transform_cache = TransformCache()
+simplify_cache = GeometryCache()
+
+
+# The context variables of BaseGeometryWidget.get_static_context(), keyed on
+# the geometry type and the language.
+static_contexts = {}
+
+
+def clear_static_contexts(**kwargs):
+    static_contexts.clear()
+
+
+setting_changed.connect(clear_static_contexts)
+
+
+def geojson_geometry(geometry, precision=None):
+    """
+    Returns the GeoJSON geometry object of a GEOS geometry as a dict, with
+    the coordinates rounded to ``precision`` decimals if it's not ``None``.
+    """
+    if geometry.geom_type == 'GeometryCollection':
+        return {
+            'type': 'GeometryCollection',
+            'geometries': [geojson_geometry(child, precision)
+                           for child in geometry],
+        }
+    geom_type = geometry.geom_type
+    if geom_type == 'LinearRing':
+        geom_type = 'LineString'
+    coords = geometry.coords
+    if precision is not None:
+        coords = _round_coords(coords, precision)
+    return {'type': geom_type, 'coordinates': coords}
+
+
+def _round_coords(coords, precision):
+    if isinstance(coords, float):
+        return round(coords, precision)
+    return [_round_coords(coord, precision) for coord in coords]
 
 
 class BaseGeometryWidget(forms.Textarea):
@@ -29,7 +153,20 @@ class BaseGeometryWidget(forms.Textarea):
     map_width = 600
     map_height = 400
     map_srid = 4326
+    simplify_tolerance = None
     template_name = 'floppyforms/gis/openlayers.html'
+    transform_cache = transform_cache
+    simplify_cache = simplify_cache
+
+    # The maximum size in bytes of the decompressed full precision geometry
+    # submitted along with simplified geometries.
+    max_full_value_size = 16 * 1024 * 1024
+
+    # How geometries are serialized in the form: 'wkt', 'hexwkb',
+    # 'base64wkb' or 'geojson'.
+    wire_format = 'wkt'
+    wire_formats = ('wkt', 'hexwkb', 'base64wkb', 'geojson')
+    coordinate_precision = None
 
     # Internal API #
     is_point = False
@@ -38,36 +175,82 @@ class BaseGeometryWidget(forms.Textarea):
     is_collection = False
     geom_type = 'GEOMETRY'
 
-    map_attrs = ('map_width', 'map_height', 'map_srid', 'display_wkt')
+    map_attrs = ('map_width', 'map_height', 'map_srid', 'display_wkt',
+                 'simplify_tolerance', 'wire_format', 'coordinate_precision')
 
     def __init__(self, *args, **kwargs):
         super(BaseGeometryWidget, self).__init__(*args, **kwargs)
         attrs = kwargs.pop('attrs', {})
         for key in self.map_attrs:
             setattr(self, key, attrs.pop(key, getattr(self, key)))
+        if self.wire_format not in self.wire_formats:
+            raise ValueError('Unknown wire format %r, expected one of %s.' %
+                             (self.wire_format, ', '.join(self.wire_formats)))
+
+    def get_static_context(self):
+        """
+        Returns the part of the context that only depends on the geometry
+        type, the settings and the active language. It's computed once and
+        shared by all widgets, don't modify it.
+        """
+        key = (self.geom_type, translation.get_language())
+        try:
+            return static_contexts[key]
+        except KeyError:
+            pass
+        if self.geom_type == 'GEOMETRYCOLLECTION':
+            geom_type = 'Collection'
+        else:
+            geom_type = gdal.OGRGeomType(self.geom_type)
+
+        # Deprecated, we will remove this in a future release, it's no longer
+        # used. But we keep it here for now as it's documented in
+        # docs/geodjango.rst
+
+        # Django >= 1.4 doesn't have ADMIN_MEDIA_PREFIX anymore, we must
+        # rely on contrib.staticfiles.
+        if hasattr(settings, 'ADMIN_MEDIA_PREFIX'):
+            admin_media_prefix = settings.ADMIN_MEDIA_PREFIX
+        else:
+            admin_media_prefix = settings.STATIC_URL + 'admin/'
+        static_contexts[key] = context = {
+            'geom_type': geom_type,
+            'ADMIN_MEDIA_PREFIX': admin_media_prefix,
+            'LANGUAGE_BIDI': translation.get_language_bidi(),
+        }
+        return context
 
     def get_context_data(self):
         ctx = super(BaseGeometryWidget, self).get_context_data()
         for key in ('is_polygon', 'is_linestring',
                     'is_point', 'is_collection'):
             ctx[key] = getattr(self, key)
-        ctx['geom_type'] = gdal.OGRGeomType(self.geom_type)
 
         for key in self.map_attrs:
             ctx[key] = getattr(self, key)
 
-        if self.geom_type == 'GEOMETRYCOLLECTION':
-            ctx['geom_type'] = 'Collection'
+        ctx.update(self.get_static_context())
         return ctx
 
-    def get_context(self, name, value, attrs=None, extra_context={}):
+    def get_wkt(self, value):
+        """
+        Returns the WKT of ``value`` in ``map_srid``, or an empty string if
+        it's empty, invalid or of the wrong geometry type.
+        """
         # If a string reaches here (via a validation error on another
-        # field) then just reconstruct the Geometry.
+        # field) then it's passed through when its header says it's WKT
+        # already in the map's SRID, otherwise the geometry is rebuilt.
+        # GeometryField validates the coordinates of submitted data.
         if isinstance(value, str):
-            try:
-                value = geos.GEOSGeometry(value)
-            except (geos.GEOSException, ValueError):
-                value = None
+            header = parse_wkt_header(value)
+            if header is not None and header[0] in (None, self.map_srid):
+                srid, geom_type, wkt = header
+                if self.geom_type not in (geom_type, 'GEOMETRY'):
+                    return ''
+                return wkt
+            value = self.deserialize(value)
+            if value is None:
+                return ''
 
         if value and value.geom_type.upper() != self.geom_type and self.geom_type != 'GEOMETRY':
             value = None
@@ -78,28 +261,157 @@ class BaseGeometryWidget(forms.Textarea):
             srid = self.map_srid
             if value.srid != srid:
                 try:
-                    ogr = value.ogr
-                    ogr.transform(srid)
-                    wkt = ogr.wkt
+                    if self.transform_cache is not None:
+                        wkt = self.transform_cache.transform(value, srid)
+                    else:
+                        ogr = value.ogr
+                        ogr.transform(srid)
+                        wkt = ogr.wkt
                 except gdal.GDALException:
                     pass  # wkt left as an empty string
             else:
                 wkt = value.wkt
+        return wkt
+
+    def serialize(self, wkt):
+        """
+        Returns the ``wire_format`` serialization of the geometry, given
+        as WKT in ``map_srid``.
+        """
+        if self.wire_format == 'wkt' and self.coordinate_precision is None:
+            return wkt
+        try:
+            geometry = geos.GEOSGeometry(wkt, self.map_srid)
+        except (geos.GEOSException, ValueError):
+            return ''
+        if self.wire_format == 'hexwkb':
+            return geometry.hex.decode('ascii')
+        if self.wire_format == 'base64wkb':
+            return base64.b64encode(bytes(geometry.wkb)).decode('ascii')
+        if self.wire_format == 'geojson':
+            return json.dumps(
+                geojson_geometry(geometry, self.coordinate_precision),
+                separators=(',', ':'))
+        writer = geos.WKTWriter(dim=3 if geometry.hasz else 2, trim=True,
+                                precision=self.coordinate_precision)
+        return writer.write(geometry).decode()
+
+    def deserialize(self, value):
+        """
+        Returns the geometry for a string in ``wire_format``, or ``None`` if
+        it can't be parsed. Also used by ``GeometryField.to_python()``.
+        """
+        try:
+            if self.wire_format == 'base64wkb':
+                geometry = geos.GEOSGeometry(
+                    memoryview(base64.b64decode(value)))
+            else:
+                geometry = geos.GEOSGeometry(value)
+        except (geos.GEOSException, gdal.GDALException, ValueError,
+                TypeError):
+            return None
+        # Like in GeometryField, values without a SRID are in the map's SRID.
+        # GDAL assumes WGS84 for GeoJSON, but the javascript library writes
+        # coordinates in the map's projection. The SRID of EWKT values, e.g.
+        # initial data, is kept.
+        if geometry.srid is None:
+            geometry.srid = self.map_srid
+        elif self.wire_format == 'geojson' and value.lstrip().startswith('{'):
+            geometry.srid = self.map_srid
+        return geometry
+
+    def simplify(self, wkt):
+        """
+        Simplifies the geometry for display on the map, preserving its
+        topology. Returns the WKT to display and the EWKB of the full
+        precision geometry, or ``None`` if nothing was simplified.
+        """
+        try:
+            geometry = geos.GEOSGeometry(wkt, self.map_srid)
+        except (geos.GEOSException, ValueError):
+            return wkt, None
+        simplified = geometry.simplify(self.simplify_tolerance,
+                                       preserve_topology=True)
+        if simplified.num_coords >= geometry.num_coords:
+            return wkt, None
+        return simplified.wkt, bytes(geometry.ewkb)
+
+    def get_display_value(self, wkt):
+        """
+        Returns the value of the textarea for the WKT in ``map_srid`` and the
+        value of the hidden input that holds the full precision geometry, or
+        ``None`` if it's not simplified. Simplified values are kept in
+        ``simplify_cache``.
+        """
+        if not self.simplify_tolerance:
+            return self.serialize(wkt), None
+        key = None
+        if self.simplify_cache is not None:
+            key = (hashlib.sha1(wkt.encode('utf-8')).digest(), self.map_srid,
+                   self.simplify_tolerance, self.wire_format,
+                   self.coordinate_precision)
+            values = self.simplify_cache.get(key)
+            if values is not None:
+                return values
+        wkt, ewkb = self.simplify(wkt)
+        value = self.serialize(wkt)
+        full_value = None
+        if ewkb is not None:
+            full_value = pack_full_value(value, ewkb)
+        if key is not None:
+            self.simplify_cache.add(key, (value, full_value))
+        return value, full_value
+
+    def get_full_value_name(self, name):
+        return '%s_full' % name
+
+    def decode_full_value(self, full_value, value):
+        """
+        Returns the full precision geometry submitted along with the
+        simplified ``value``, or ``None`` if it can't be decoded or if
+        ``value`` was edited.
+        """
+        ewkb = unpack_full_value(full_value, value, self.max_full_value_size)
+        if ewkb is None:
+            return None
+        try:
+            geometry = geos.GEOSGeometry(memoryview(ewkb))
+        except (ValueError, TypeError, geos.GEOSException):
+            return None
+        if geometry.srid is None:
+            geometry.srid = self.map_srid
+        return geometry
+
+    def value_from_datadict(self, data, files, name):
+        value = super(BaseGeometryWidget, self).value_from_datadict(
+            data, files, name)
+        # The full precision geometry is only used while the textarea holds
+        # the simplified geometry it was rendered with. The javascript
+        # library also empties it as soon as the geometry is edited.
+        if value and self.simplify_tolerance:
+            full_value = data.get(self.get_full_value_name(name))
+            if full_value:
+                geometry = self.decode_full_value(full_value, value)
+                if geometry is not None:
+                    return geometry
+        # WKT is kept as a string so that it can be passed through when the
+        # form is displayed again, other formats are only parsed once.
+        if value and self.wire_format != 'wkt':
+            geometry = self.deserialize(value)
+            if geometry is not None:
+                return geometry
+        return value
+
+    def get_context(self, name, value, attrs=None, extra_context={}):
+        wkt = self.get_wkt(value)
+        full_value = None
+        if wkt:
+            wkt, full_value = self.get_display_value(wkt)
         context = super(BaseGeometryWidget, self).get_context(name, wkt, attrs)
         context['module'] = 'map_%s' % name.replace('-', '_')
         context['name'] = name
-
-        # Deprecated, we will remove this in a future release, it's no longer
-        # used. But we keep it here for now as it's documented in
-        # docs/geodjango.rst
-
-        # Django >= 1.4 doesn't have ADMIN_MEDIA_PREFIX anymore, we must
-        # rely on contrib.staticfiles.
-        if hasattr(settings, 'ADMIN_MEDIA_PREFIX'):
-            context['ADMIN_MEDIA_PREFIX'] = settings.ADMIN_MEDIA_PREFIX
-        else:
-            context['ADMIN_MEDIA_PREFIX'] = settings.STATIC_URL + 'admin/'
-        context['LANGUAGE_BIDI'] = translation.get_language_bidi()
+        context['full_value'] = full_value
+        context['full_value_name'] = self.get_full_value_name(name)
         return context
 
 
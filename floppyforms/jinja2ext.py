@@ -0,0 +1,392 @@
+"""
+A Jinja2 extension providing the ``form``, ``formrow``, ``formfield``,
+``formconfig`` and ``formerrors`` tags of the ``floppyforms`` template tag
+library. Enable it in the ``OPTIONS`` of a Jinja2 template backend::
+
+    TEMPLATES = [
+        {
+            'BACKEND': 'django.template.backends.jinja2.Jinja2',
+            'APP_DIRS': True,
+            'OPTIONS': {
+                'extensions': ['floppyforms.jinja2ext.floppyforms'],
+            },
+        },
+    ]
+
+The tags take the same arguments as their Django counterparts, the ``with``
+arguments can optionally be separated by commas.
+"""
+from django.templatetags.static import static
+from django.utils.safestring import mark_safe
+from jinja2 import nodes
+from jinja2.exceptions import TemplateRuntimeError
+from jinja2.ext import Extension
+from jinja2.runtime import Undefined, new_context
+
+from .compat import get_template, is_bundled_path
+from .templatetags.floppyforms import (BaseFormNode, ConfigFilter, FormConfig,
+                                       FormConfigNode, SharedDatalists,
+                                       form_rows, get_errors_template_name,
+                                       hidden_field_errors, id as id_filter,
+                                       is_bound_field, is_form, is_formset,
+                                       memoize_hidden_field_errors,
+                                       render_errors, render_widget,
+                                       top_errors)
+
+
+__all__ = ('FloppyformsExtension',)
+
+
+CONFIG_CONTEXT_VAR = BaseFormNode.CONFIG_CONTEXT_ATTR
+DATALISTS_CONTEXT_VAR = BaseFormNode.DATALISTS_CONTEXT_ATTR
+IN_FORM_CONTEXT_VAR = BaseFormNode.IN_FORM_CONTEXT_VAR
+
+# The variables a {% form ... using %}...{% endform %} body is called with.
+FORM_BODY_VARS = ('form', 'forms', CONFIG_CONTEXT_VAR, IN_FORM_CONTEXT_VAR,
+                  DATALISTS_CONTEXT_VAR)
+
+
+def is_form_list(var):
+    if not hasattr(var, '__iter__'):
+        return False
+    if is_formset(var):
+        return True
+    if is_form(var):
+        return False
+    # form duck-typing was not successful so it must be a list
+    return True
+
+
+def is_field_list(var):
+    return hasattr(var, '__iter__') and not is_bound_field(var)
+
+
+def resolve_variables(variables, is_list_variable):
+    resolved = []
+    for variable in variables:
+        if variable is None or isinstance(variable, Undefined):
+            continue
+        if is_list_variable(variable):
+            resolved.extend(variable)
+        else:
+            resolved.append(variable)
+    return resolved
+
+
+class FloppyformsExtension(Extension):
+    tags = set(['form', 'formrow', 'formfield', 'formconfig', 'formerrors'])
+
+    def __init__(self, environment):
+        super(FloppyformsExtension, self).__init__(environment)
+        environment.filters.setdefault('id', id_filter)
+        environment.filters.setdefault('hidden_field_errors',
+                                       hidden_field_errors)
+        environment.filters.setdefault('top_errors', top_errors)
+        # Used by the floppyforms/gis/ templates.
+        environment.globals.setdefault('static', static)
+
+    # Parsing
+
+    def parse(self, parser):
+        token = next(parser.stream)
+        return getattr(self, 'parse_%s' % token.value)(parser, token)
+
+    def is_flag(self, parser, flags):
+        stream = parser.stream
+        if not stream.current.test_any(*['name:%s' % flag for flag in flags]):
+            return False
+        return stream.look().test('block_end')
+
+    def parse_variables(self, parser, tagname, flags=()):
+        variables = []
+        stream = parser.stream
+        end = ['block_end', 'name:using', 'name:with', 'name:only']
+        while not stream.current.test_any(*end):
+            if variables and self.is_flag(parser, flags):
+                break
+            variables.append(parser.parse_expression())
+        if not variables:
+            parser.fail('%s tag expectes at least one template variable as '
+                        'argument.' % tagname)
+        return variables
+
+    def parse_using(self, parser, tagname):
+        if not parser.stream.skip_if('name:using'):
+            return nodes.Const(None)
+        if parser.stream.current.test_any('block_end', 'name:with',
+                                          'name:only'):
+            parser.fail('%s: expected a template name after "using".' %
+                        tagname)
+        return parser.parse_expression()
+
+    def parse_with(self, parser, tagname):
+        stream = parser.stream
+        items = []
+        if stream.skip_if('name:with'):
+            while stream.current.test('name'):
+                if not stream.look().test('assign'):
+                    break
+                key = next(stream).value
+                stream.expect('assign')
+                items.append(nodes.Pair(nodes.Const(key),
+                                        parser.parse_expression()))
+                stream.skip_if('comma')
+            if not items:
+                parser.fail('"with" in %s tag needs at least one keyword '
+                            'argument.' % tagname)
+        return nodes.Dict(items)
+
+    def parse_only(self, parser):
+        return nodes.Const(bool(parser.stream.skip_if('name:only')))
+
+    def parse_form(self, parser, token):
+        stream = parser.stream
+        flags = ('share_datalists',)
+        variables = self.parse_variables(parser, 'form', flags)
+        using = nodes.Const(None)
+        # Without a template name after "using" the tag renders its content
+        # until {% endform %}.
+        is_block = False
+        if stream.skip_if('name:using'):
+            is_block = stream.current.test('block_end')
+            if not is_block:
+                is_block = self.is_flag(parser, flags)
+            if not is_block:
+                if stream.current.test_any('name:with', 'name:only'):
+                    parser.fail('form: you must provide one template after '
+                                '"using" and before "with" or "only".')
+                using = parser.parse_expression()
+        elif not stream.current.test('block_end'):
+            if not self.is_flag(parser, flags):
+                parser.fail('Unknown argument for form tag: %r.' %
+                            stream.current.value)
+        if is_block:
+            # The content of the tag is rendered with the variables of the
+            # template, "with" and "only" are rejected above.
+            extra = nodes.Dict([])
+            only = nodes.Const(False)
+        else:
+            extra = self.parse_with(parser, 'form')
+            only = self.parse_only(parser)
+        share_datalists = nodes.Const(
+            bool(stream.skip_if('name:share_datalists')))
+
+        args = [nodes.List(variables), using, extra, only, share_datalists,
+                nodes.DerivedContextReference()]
+        call = self.call_method('_render_form', args, lineno=token.lineno)
+        if not is_block:
+            return nodes.Output([call], lineno=token.lineno)
+        body = parser.parse_statements(('name:endform',), drop_needle=True)
+        params = [nodes.Name(name, 'param') for name in FORM_BODY_VARS]
+        return nodes.CallBlock(call, params, [], body, lineno=token.lineno)
+
+    def parse_formrow(self, parser, token):
+        variables = self.parse_variables(parser, 'formrow')
+        args = [nodes.List(variables), self.parse_using(parser, 'formrow'),
+                self.parse_with(parser, 'formrow'), self.parse_only(parser),
+                nodes.DerivedContextReference()]
+        return nodes.Output(
+            [self.call_method('_render_formrow', args, lineno=token.lineno)],
+            lineno=token.lineno)
+
+    def parse_formfield(self, parser, token):
+        variables = self.parse_variables(parser, 'formfield')
+        if len(variables) != 1:
+            parser.fail('formfield tag expectes exactly one template '
+                        'variable as argument.', token.lineno)
+        args = [variables[0], self.parse_using(parser, 'formfield'),
+                self.parse_with(parser, 'formfield'), self.parse_only(parser),
+                nodes.DerivedContextReference()]
+        return nodes.Output(
+            [self.call_method('_render_formfield', args,
+                              lineno=token.lineno)],
+            lineno=token.lineno)
+
+    def parse_formconfig(self, parser, token):
+        stream = parser.stream
+        modifiers = FormConfigNode.MODIFIERS
+        if not stream.current.test_any(
+                *['name:%s' % modifier for modifier in modifiers]):
+            parser.fail('formconfig needs one of the following keywords as '
+                        'first argument: %s' % ', '.join(modifiers.keys()),
+                        token.lineno)
+        modifier = next(stream).value
+        if stream.current.test('block_end'):
+            parser.fail('formconfig %s: at least one argument is required.' %
+                        modifier, token.lineno)
+        using = self.parse_using(parser, 'formconfig')
+        extra = self.parse_with(parser, 'formconfig')
+        for_ = nodes.Const(None)
+        has_for = False
+        if modifiers[modifier].accept_for_parameter and \
+                stream.skip_if('name:for'):
+            for_ = parser.parse_expression()
+            has_for = True
+        args = [nodes.Const(modifier), using, extra, nodes.Const(has_for),
+                for_, nodes.DerivedContextReference()]
+        return nodes.ExprStmt(
+            self.call_method('_formconfig', args, lineno=token.lineno),
+            lineno=token.lineno)
+
+    def parse_formerrors(self, parser, token):
+        args = [parser.parse_expression(), nodes.DerivedContextReference()]
+        return nodes.Output(
+            [self.call_method('_render_formerrors', args,
+                              lineno=token.lineno)],
+            lineno=token.lineno)
+
+    # Rendering
+
+    def get_config(self, context):
+        return context.get(CONFIG_CONTEXT_VAR) or FormConfig()
+
+    def render_template(self, context, template_name, extra_context, only):
+        if only:
+            variables = extra_context
+        else:
+            variables = dict(context.get_all(), **extra_context)
+        return get_template(context, template_name).render(variables)
+
+    def _render_form(self, variables, template_name, extra, only,
+                     share_datalists, context, caller=None):
+        config = self.get_config(context)
+        datalists = context.get(DATALISTS_CONTEXT_VAR)
+        # An outer form tag may already collect the datalists.
+        collect_datalists = share_datalists and datalists is None
+        if collect_datalists:
+            datalists = SharedDatalists()
+
+        forms = resolve_variables(variables, is_form_list)
+        extra_context = {
+            'form': forms[0] if forms else None,
+            'forms': forms,
+            CONFIG_CONTEXT_VAR: config,
+            IN_FORM_CONTEXT_VAR: True,
+            DATALISTS_CONTEXT_VAR: datalists,
+        }
+        extra_context.update(extra)
+
+        config.push()
+        try:
+            with memoize_hidden_field_errors():
+                if caller is not None:
+                    output = caller(*[extra_context[name]
+                                      for name in FORM_BODY_VARS])
+                else:
+                    if template_name is None:
+                        template_name = config.retrieve('layout')
+                    output = self.render_template(context, template_name,
+                                                  extra_context, only)
+        finally:
+            config.pop()
+        if collect_datalists:
+            output += datalists.render()
+        return mark_safe(output)
+
+    def _render_formrow(self, variables, template_name, extra, only,
+                        context):
+        config = self.get_config(context)
+        fields = resolve_variables(variables, is_field_list)
+        extra_context = {}
+        # most recently used values should overwrite older ones
+        for row_context in reversed(config.retrieve_all('row_context')):
+            extra_context.update(row_context)
+        extra_context.update({
+            'field': fields[0] if fields else None,
+            'fields': fields,
+            CONFIG_CONTEXT_VAR: config,
+        })
+        extra_context.update(extra)
+        if 'label' in extra_context:
+            label = extra_context['label']
+        elif not only:
+            label = context.get('label')
+        else:
+            label = None
+        extra_context['rows'] = form_rows(fields, label)
+        if template_name is None:
+            template_name = config.retrieve('row_template')
+
+        config.push()
+        try:
+            output = self.render_template(context, template_name,
+                                          extra_context, only)
+        finally:
+            config.pop()
+        return mark_safe(output)
+
+    def _render_formfield(self, bound_field, template_name, extra, only,
+                          context):
+        if isinstance(bound_field, Undefined):
+            # Empty, unless the environment uses a stricter undefined type.
+            return str(bound_field)
+        config = self.get_config(context)
+        widget = config.retrieve('widget', bound_field=bound_field)
+        extra_context = {}
+        # most recently used values should overwrite older ones
+        widget_context = config.retrieve_all('widget_context',
+                                             bound_field=bound_field)
+        for configured_context in reversed(widget_context):
+            extra_context.update(configured_context)
+        extra_context['field'] = bound_field
+        extra_context[CONFIG_CONTEXT_VAR] = config
+        extra_context.update(extra)
+        if template_name is None:
+            template_name = config.retrieve('widget_template',
+                                            bound_field=bound_field)
+        if not only:
+            extra_context = dict(context.get_all(), **extra_context)
+        # The widget renders its template with this context's environment.
+        context_instance = new_context(self.environment, context.name, {},
+                                       extra_context, shared=True)
+
+        parameters = {
+            'template_name': template_name,
+            'context_instance': context_instance,
+        }
+        datalists = context.get(DATALISTS_CONTEXT_VAR)
+        if datalists is not None and getattr(widget, 'datalist', None) \
+                is not None and getattr(widget, 'datalist_id', None) is None:
+            parameters['datalist_id'] = datalists.register(bound_field,
+                                                           widget)
+
+        config.push()
+        try:
+            output = render_widget(bound_field, widget, **parameters)
+        finally:
+            config.pop()
+
+        if bound_field.field.show_hidden_initial:
+            output += bound_field.as_hidden(only_initial=True)
+        return mark_safe(output)
+
+    def _render_formerrors(self, errors, context):
+        def is_bundled(template_name):
+            return is_bundled_path(
+                get_template(context, template_name).filename)
+
+        template_name = get_errors_template_name(is_bundled)
+        if template_name is None:
+            return render_errors(errors)
+        return mark_safe(self.render_template(context, template_name,
+                                              {'errors': errors}, False))
+
+    def _formconfig(self, modifier, template_name, extra, has_for, for_,
+                    context):
+        if not context.get(IN_FORM_CONTEXT_VAR, False):
+            raise TemplateRuntimeError('formconfig must be used inside a '
+                                       'form tag.')
+        if has_for and isinstance(for_, Undefined):
+            return
+        modifier = FormConfigNode.MODIFIERS[modifier]
+        config = self.get_config(context)
+        filter = ConfigFilter(for_) if has_for else None
+        if template_name is not None:
+            config.configure(modifier.template_config_name, template_name,
+                             filter=filter)
+        if extra:
+            config.configure(modifier.context_config_name, extra,
+                             filter=filter)
+
+
+floppyforms = FloppyformsExtension
@@ -1,24 +1,57 @@
 import warnings
+import weakref
+from itertools import chain
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.forms import models
+from django.utils.encoding import force_str
 
 from .fields import Field
 from .forms import LayoutRenderer
 from .widgets import Select, SelectMultiple, MultipleHiddenInput
 
-__all__ = ('ModelForm', 'ModelChoiceField', 'ModelMultipleChoiceField')
+__all__ = ('ModelForm', 'ModelChoiceField', 'ModelMultipleChoiceField',
+           'WindowedSelect', 'WindowedSelectMultiple')
 
 
-class ModelForm(LayoutRenderer, models.ModelForm):
+MODELFORM_DEPRECATION_MESSAGE = (
+    'The behaviour of subclasses of floppyforms.models.ModelForm will '
+    'change with django-floppyforms 2.0. '
+    'Use `import floppyforms.__future__ as forms` instead of '
+    '`import floppyforms as forms` to use the new behaviour now. '
+    'See announcement here: '
+    'https://github.com/jazzband/django-floppyforms/tree/1.2.0/CHANGES.rst')
+
+# ModelForm classes that already emitted the deprecation warning.
+_warned_modelform_classes = weakref.WeakSet()
+
+
+class ModelFormMetaclass(models.ModelFormMetaclass):
+    """
+    With the ``FLOPPYFORMS_FUTURE_MODELFORMS`` setting enabled, model forms
+    get floppyforms fields like ``floppyforms.__future__.ModelForm`` does.
+    """
+    def __new__(mcs, name, bases, attrs):
+        # Settings may not be configured yet when floppyforms is imported.
+        future = settings.configured and getattr(
+            settings, 'FLOPPYFORMS_FUTURE_MODELFORMS', False)
+        if future and not attrs.get('formfield_callback'):
+            from .__future__.models import formfield_callback
+            attrs['formfield_callback'] = formfield_callback
+        new_class = super(ModelFormMetaclass, mcs).__new__(mcs, name, bases,
+                                                           attrs)
+        new_class._floppyforms_future = future
+        return new_class
+
+
+class ModelForm(LayoutRenderer, models.ModelForm,
+                metaclass=ModelFormMetaclass):
     def __new__(cls, *args, **kwargs):
-        url = 'https://github.com/jazzband/django-floppyforms/tree/1.2.0/CHANGES.rst'
-        warnings.warn(
-            'The behaviour of subclasses of floppyforms.models.ModelForm will '
-            'change with django-floppyforms 2.0. '
-            'Use `import floppyforms.__future__ as forms` instead of '
-            '`import floppyforms as forms` to use the new behaviour now. '
-            'See announcement here: %s' % url,
-            FutureWarning)
+        if not cls._floppyforms_future:
+            if cls not in _warned_modelform_classes:
+                _warned_modelform_classes.add(cls)
+                warnings.warn(MODELFORM_DEPRECATION_MESSAGE, FutureWarning)
         return super(ModelForm, cls).__new__(cls, *args, **kwargs)
 
 
@@ -29,3 +62,94 @@ class ModelChoiceField(Field, models.ModelChoiceField):
 class ModelMultipleChoiceField(Field, models.ModelMultipleChoiceField):
     widget = SelectMultiple
     hidden_widget = MultipleHiddenInput
+
+
+def keyset_page(queryset, key='pk', after=None, limit=100):
+    """
+    Returns a tuple ``(objects, next_key)`` with at most ``limit`` objects
+    of ``queryset`` ordered by ``key`` and whose ``key`` is greater than
+    ``after``. ``next_key`` is the value to pass as ``after`` to get the next
+    page, or ``None`` if there are no more objects.
+
+    The ordering of ``queryset`` is replaced by ``key``, which must be
+    unique for the pages not to skip or repeat objects.
+
+    Unlike offset pagination this stays cheap on large tables as long as
+    ``key`` is indexed.
+    """
+    queryset = queryset.order_by(key)
+    if after is not None:
+        queryset = queryset.filter(**{'%s__gt' % key: after})
+    objects = list(queryset[:limit + 1])
+    if len(objects) > limit:
+        objects = objects[:limit]
+        return objects, objects[-1].serializable_value(key)
+    return objects, None
+
+
+class WindowedSelect(Select):
+    """
+    A ``<select>`` for ``ModelChoiceField`` and ``ModelMultipleChoiceField``
+    that only renders the selected options plus the first ``window_size``
+    options of the queryset instead of every row of the table.
+
+    If ``choices_url`` is given it is rendered as ``data-choices-url``
+    attribute, pointing to a ``floppyforms.views.ModelChoicesView`` that
+    serves the remaining options.
+
+    Other choices are rendered in full, like with ``Select``.
+    """
+    window_size = 100
+    choices_url = None
+
+    def __init__(self, attrs=None, choices=(), window_size=None,
+                 choices_url=None):
+        super(WindowedSelect, self).__init__(attrs, choices)
+        if window_size is not None:
+            self.window_size = window_size
+        if choices_url is not None:
+            self.choices_url = choices_url
+
+    def get_choices(self, value, choices=()):
+        iterator = self.choices
+        if not hasattr(iterator, 'queryset'):
+            return super(WindowedSelect, self).get_choices(value, choices)
+        field = iterator.field
+        key = field.to_field_name or 'pk'
+
+        window = []
+        if field.empty_label is not None:
+            window.append(('', field.empty_label))
+
+        # The first page of keyset_page(), without the extra row that tells
+        # whether there's a next page: ModelChoicesView answers that.
+        objects = iterator.queryset.order_by(key)[:self.window_size]
+        page = [iterator.choice(obj) for obj in objects]
+
+        # The selected options that aren't in the page come first, so that
+        # the page keeps its order and the value of the last rendered option
+        # is the cursor for the next page of choices.
+        in_page = set(force_str(option[0]) for option in page)
+        values = [v for v in value
+                  if v not in (None, '') and force_str(v) not in in_page]
+        if values:
+            lookup = {'%s__in' % key: values}
+            try:
+                window.extend(iterator.choice(obj) for obj in
+                              iterator.queryset.filter(**lookup).order_by(key))
+            except (ValueError, TypeError, ValidationError):
+                # Invalid submitted values, nothing to mark as selected.
+                pass
+        window.extend(page)
+        return chain(window, choices)
+
+    def get_context(self, name, value, attrs=None, choices=()):
+        context = super(WindowedSelect, self).get_context(name, value, attrs,
+                                                          choices)
+        if self.choices_url is not None:
+            context['attrs']['data-choices-url'] = self.choices_url
+        return context
+
+
+class WindowedSelectMultiple(WindowedSelect, SelectMultiple):
+    pass
@@ -160,6 +160,212 @@ OpenLayers.Format.DjangoWKT = OpenLayers.Class(OpenLayers.Format.WKT, {
 	CLASS_NAME: "OpenLayers.Format.DjangoWKT"
 });
 
+/**
+ * Class: OpenLayers.Format.DjangoWKB
+ * Class for reading and writing Well-Known Binary, encoded in hexadecimal
+ * or in base64. EWKB SRIDs, Z and M values are skipped when reading.
+ *
+ * Inherits from:
+ *  - <OpenLayers.Format>
+ */
+
+OpenLayers.Format.DjangoWKB = OpenLayers.Class(OpenLayers.Format, {
+	base64: false,
+
+	types: {
+		1: 'Point',
+		2: 'LineString',
+		3: 'Polygon',
+		4: 'MultiPoint',
+		5: 'MultiLineString',
+		6: 'MultiPolygon',
+		7: 'Collection'
+	},
+
+	codes: {
+		'Point': 1,
+		'LineString': 2,
+		'LinearRing': 2,
+		'Polygon': 3,
+		'MultiPoint': 4,
+		'MultiLineString': 5,
+		'MultiPolygon': 6,
+		'Collection': 7
+	},
+
+	read: function(data) {
+		var bytes = this.base64 ? this.decodeBase64(data) : this.decodeHex(data);
+		var cursor = {view: new DataView(bytes.buffer), offset: 0};
+		return new OpenLayers.Feature.Vector(this.readGeometry(cursor));
+	},
+
+	readGeometry: function(cursor) {
+		var view = cursor.view;
+		var littleEndian = view.getUint8(cursor.offset) === 1;
+		var flags = view.getUint32(cursor.offset + 1, littleEndian);
+		cursor.offset += 5;
+		var type = flags & 0x0fffffff;
+		var dims = 2;
+		if (flags & 0x80000000) {
+			dims += 1;
+		}
+		if (flags & 0x40000000) {
+			dims += 1;
+		}
+		if (flags & 0x20000000) {
+			cursor.offset += 4;  // SRID
+		}
+		if (type > 1000) {  // ISO WKB: 1000 for Z, 2000 for M, 3000 for ZM
+			dims += Math.floor(type / 1000) === 3 ? 2 : 1;
+			type = type % 1000;
+		}
+		cursor.littleEndian = littleEndian;
+		cursor.dims = dims;
+		var i, count, components = [];
+		switch (this.types[type]) {
+			case 'Point':
+				return this.readPoint(cursor);
+			case 'LineString':
+				return new OpenLayers.Geometry.LineString(this.readPoints(cursor));
+			case 'Polygon':
+				count = this.readCount(cursor);
+				for (i=0; i<count; i++) {
+					components.push(new OpenLayers.Geometry.LinearRing(this.readPoints(cursor)));
+				}
+				return new OpenLayers.Geometry.Polygon(components);
+			case undefined:
+				throw 'Unknown WKB geometry type: ' + type;
+			default:
+				count = this.readCount(cursor);
+				for (i=0; i<count; i++) {
+					components.push(this.readGeometry(cursor));
+				}
+				return new OpenLayers.Geometry[this.types[type]](components);
+		}
+	},
+
+	readCount: function(cursor) {
+		var count = cursor.view.getUint32(cursor.offset, cursor.littleEndian);
+		cursor.offset += 4;
+		return count;
+	},
+
+	readPoint: function(cursor) {
+		var x = cursor.view.getFloat64(cursor.offset, cursor.littleEndian);
+		var y = cursor.view.getFloat64(cursor.offset + 8, cursor.littleEndian);
+		cursor.offset += 8 * cursor.dims;
+		return new OpenLayers.Geometry.Point(x, y);
+	},
+
+	readPoints: function(cursor) {
+		var count = this.readCount(cursor);
+		var points = [];
+		for (var i=0; i<count; i++) {
+			points.push(this.readPoint(cursor));
+		}
+		return points;
+	},
+
+	write: function(feature) {
+		var parts = [];
+		this.writeGeometry(feature.geometry, parts);
+		var length = 0, i;
+		for (i=0; i<parts.length; i++) {
+			length += parts[i].byteLength;
+		}
+		var bytes = new Uint8Array(length);
+		var offset = 0;
+		for (i=0; i<parts.length; i++) {
+			bytes.set(new Uint8Array(parts[i]), offset);
+			offset += parts[i].byteLength;
+		}
+		return this.base64 ? this.encodeBase64(bytes) : this.encodeHex(bytes);
+	},
+
+	writeGeometry: function(geometry, parts) {
+		var type = geometry.CLASS_NAME.split('.')[2];
+		var header = new DataView(new ArrayBuffer(5));
+		header.setUint8(0, 1);  // little endian
+		header.setUint32(1, this.codes[type], true);
+		parts.push(header.buffer);
+		var i, components = geometry.components;
+		switch (type) {
+			case 'Point':
+				parts.push(this.writePoints([geometry], false));
+				break;
+			case 'LineString':
+			case 'LinearRing':
+				parts.push(this.writePoints(components, true));
+				break;
+			case 'Polygon':
+				parts.push(this.writeCount(components.length));
+				for (i=0; i<components.length; i++) {
+					parts.push(this.writePoints(components[i].components, true));
+				}
+				break;
+			default:
+				parts.push(this.writeCount(components.length));
+				for (i=0; i<components.length; i++) {
+					this.writeGeometry(components[i], parts);
+				}
+		}
+	},
+
+	writeCount: function(count) {
+		var view = new DataView(new ArrayBuffer(4));
+		view.setUint32(0, count, true);
+		return view.buffer;
+	},
+
+	writePoints: function(points, withCount) {
+		var offset = withCount ? 4 : 0;
+		var view = new DataView(new ArrayBuffer(offset + 16 * points.length));
+		if (withCount) {
+			view.setUint32(0, points.length, true);
+		}
+		for (var i=0; i<points.length; i++) {
+			view.setFloat64(offset + 16 * i, points[i].x, true);
+			view.setFloat64(offset + 16 * i + 8, points[i].y, true);
+		}
+		return view.buffer;
+	},
+
+	decodeHex: function(data) {
+		var bytes = new Uint8Array(data.length / 2);
+		for (var i=0; i<bytes.length; i++) {
+			bytes[i] = parseInt(data.substr(2 * i, 2), 16);
+		}
+		return bytes;
+	},
+
+	encodeHex: function(bytes) {
+		var hex = [];
+		for (var i=0; i<bytes.length; i++) {
+			hex.push((bytes[i] < 16 ? '0' : '') + bytes[i].toString(16));
+		}
+		return hex.join('').toUpperCase();
+	},
+
+	decodeBase64: function(data) {
+		var binary = window.atob(data);
+		var bytes = new Uint8Array(binary.length);
+		for (var i=0; i<binary.length; i++) {
+			bytes[i] = binary.charCodeAt(i);
+		}
+		return bytes;
+	},
+
+	encodeBase64: function(bytes) {
+		var chunks = [];
+		for (var i=0; i<bytes.length; i+=8192) {
+			chunks.push(String.fromCharCode.apply(null, bytes.subarray(i, i + 8192)));
+		}
+		return window.btoa(chunks.join(''));
+	},
+
+	CLASS_NAME: "OpenLayers.Format.DjangoWKB"
+});
+
 function MapWidget(options) {
 	this.map = null;
 	this.controls = null;
@@ -186,7 +392,9 @@ function MapWidget(options) {
 		opacity: 0.4,
 		point_zoom: 12,
 		scale_text: false,
-		scrollable: true
+		scrollable: true,
+		wire_format: 'wkt',
+		coordinate_precision: null
 	};
 	// Altering using user-provied options
 	for (var property in options) {
@@ -195,6 +403,9 @@ function MapWidget(options) {
 		}
 	}
 
+	this.wkb_f = new OpenLayers.Format.DjangoWKB({base64: this.options.wire_format === 'base64wkb'});
+	this.geojson_f = new OpenLayers.Format.GeoJSON({ignoreExtraDims: true});
+
 	this.map = new OpenLayers.Map(this.options.map_id, this.options.map_options);
 	this.layers.base = this.options.base_layer;
 	this.map.addLayer(this.layers.base);
@@ -210,10 +421,21 @@ function MapWidget(options) {
 	var styleMap = new OpenLayers.StyleMap({'default': OpenLayers.Util.applyDefaults(defaults_style, OpenLayers.Feature.Vector.style['default'])});
 	this.layers.vector = new OpenLayers.Layer.Vector(" " + this.options.name, {styleMap: styleMap});
 	this.map.addLayer(this.layers.vector);
-	wkt = document.getElementById(this.options.id).value;
+	var textarea = document.getElementById(this.options.id);
+	var self = this;
+	textarea.onchange = function() {
+		self.discard_full_value();
+	};
+	wkt = textarea.value;
 	if (wkt) {
 		var feat = OpenLayers.Util.properFeatures(this.read_wkt(wkt), this.options.geom_type);
-		this.write_wkt(feat);
+		if (this.options.full_value_id) {
+			// The full precision geometry is only accepted along with the
+			// simplified geometry as rendered, keep it until it's edited.
+			this.count_geometries(feat);
+		} else {
+			this.write_wkt(feat);
+		}
 		if (this.options.is_collection) {
 			for (var i=0; i<this.num_geom; i++) {
 				this.layers.vector.addFeatures([new OpenLayers.Feature.Vector(feat.geometry.components[i].clone())]);
@@ -257,11 +479,53 @@ function MapWidget(options) {
 	}
 }
 
+MapWidget.prototype.round_coordinate = function(value) {
+	var factor = Math.pow(10, this.options.coordinate_precision);
+	return Math.round(value * factor) / factor;
+};
+
 MapWidget.prototype.get_ewkt = function(feat) {
-	return "SRID=" + this.options.map_srid + ";" + this.wkt_f.write(feat);
+	var wkt = this.wkt_f.write(feat);
+	if (this.options.coordinate_precision !== null) {
+		var self = this;
+		wkt = wkt.replace(/[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?/gi, function(number) {
+			return String(self.round_coordinate(parseFloat(number)));
+		});
+	}
+	return "SRID=" + this.options.map_srid + ";" + wkt;
+};
+
+MapWidget.prototype.get_geojson = function(feat) {
+	var geometry = this.geojson_f.extract.geometry.apply(this.geojson_f, [feat.geometry]);
+	if (this.options.coordinate_precision === null) {
+		return JSON.stringify(geometry);
+	}
+	var self = this;
+	return JSON.stringify(geometry, function(key, value) {
+		return typeof value === 'number' ? self.round_coordinate(value) : value;
+	});
+};
+
+MapWidget.prototype.serialize = function(feat) {
+	switch (this.options.wire_format) {
+		case 'hexwkb':
+		case 'base64wkb':
+			return this.wkb_f.write(feat);
+		case 'geojson':
+			return this.get_geojson(feat);
+		default:
+			return this.get_ewkt(feat);
+	}
 };
 
 MapWidget.prototype.read_wkt = function(wkt) {
+	switch (this.options.wire_format) {
+		case 'hexwkb':
+		case 'base64wkb':
+			return this.wkb_f.read(wkt);
+		case 'geojson':
+			return new OpenLayers.Feature.Vector(this.geojson_f.read(wkt, 'Geometry'));
+	}
 	var prefix = 'SRID=' + this.options.map_srid + ';'
 	if (wkt.indexOf(prefix) === 0) {
 		wkt = wkt.slice(prefix.length);
@@ -269,17 +533,22 @@ MapWidget.prototype.read_wkt = function(wkt) {
 	return this.wkt_f.read(wkt);
 };
 
-MapWidget.prototype.write_wkt = function(feat) {
-	feat = OpenLayers.Util.properFeatures(feat, this.options.geom_type);
+MapWidget.prototype.count_geometries = function(feat) {
 	if (this.options.is_collection) {
 		this.num_geom = feat.geometry.components.length;
 	} else {
 		this.num_geom = 1;
 	}
-	document.getElementById(this.options.id).value = this.get_ewkt(feat);
+};
+
+MapWidget.prototype.write_wkt = function(feat) {
+	feat = OpenLayers.Util.properFeatures(feat, this.options.geom_type);
+	this.count_geometries(feat);
+	document.getElementById(this.options.id).value = this.serialize(feat);
 };
 
 MapWidget.prototype.add_wkt = function(event) {
+	this.discard_full_value();
 	if (this.options.is_collection) {
 		var feat = new OpenLayers.Feature.Vector(new this.options.geom_type());
 		for (var i=0; i<this.layers.vector.features.length; i++) {
@@ -297,6 +566,7 @@ MapWidget.prototype.add_wkt = function(event) {
 };
 
 MapWidget.prototype.modify_wkt = function(event) {
+	this.discard_full_value();
 	if (this.options.is_collection) {
 		if (this.options.is_point) {
 			this.add_wkt(event);
@@ -313,6 +583,17 @@ MapWidget.prototype.modify_wkt = function(event) {
 	}
 };
 
+MapWidget.prototype.discard_full_value = function() {
+	// The geometry was simplified for display and has been edited, the full
+	// precision geometry must not be submitted anymore.
+	if (this.options.full_value_id) {
+		var full_value = document.getElementById(this.options.full_value_id);
+		if (full_value) {
+			full_value.value = '';
+		}
+	}
+};
+
 MapWidget.prototype.deleteFeatures = function() {
 	this.layers.vector.removeFeatures(this.layers.vector.features);
 	this.layers.vector.destroyFeatures();
@@ -321,6 +602,7 @@ MapWidget.prototype.deleteFeatures = function() {
 MapWidget.prototype.clearFeatures = function() {
 	this.deleteFeatures();
 	document.getElementById(this.options.id).value = '';
+	this.discard_full_value();
 	this.map.setCenter(this.defaultCenter(), this.options.default_zoom);
 };
 
@@ -1,3 +1,8 @@
+import builtins
+import copy
+import inspect
+import threading
+import warnings
 from collections import defaultdict
 from contextlib import contextmanager
 
@@ -6,9 +11,11 @@ from django.conf import settings
 from django.template import (Library, Node, Variable,
                              TemplateSyntaxError, VariableDoesNotExist)
 from django.template.base import token_kwargs
-from django.utils.functional import empty
+from django.utils.functional import cached_property, empty
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 
-from ..compat import get_template
+from ..compat import get_template, is_bundled_template
 
 
 from django.forms.utils import ErrorList
@@ -148,6 +155,20 @@ class ConfigPopException(Exception):
     pass
 
 
+def match_all(**kwargs):
+    return True
+
+
+def is_field_filter(filter):
+    """
+    Whether ``filter`` only looks at a bound field's name, field class and
+    widget class, so that its result can be shared between bound fields.
+    """
+    if filter is match_all:
+        return True
+    return type(filter) is ConfigFilter and isinstance(filter.var, str)
+
+
 class FormConfig(object):
     """
     A stack of form-configuration dictionaries, where each configured value can
@@ -165,19 +186,39 @@ class FormConfig(object):
     }
 
     def __init__(self):
-        self.dicts = [self._dict()]
+        # A frame is None until something is configured in it. The tags push
+        # a frame for every form, row and field they render, but hardly any
+        # of them configure anything.
+        self.dicts = [None]
+        # Identifies the configured values: configure() moves to a new
+        # version, pop() returns to the version the frame was pushed with.
+        # Version 0 means that nothing is configured.
+        self.version = 0
+        self._last_version = 0
+        self._versions = []
+        # Whether the filters of the current version can be memoised per
+        # field name, field class and widget class.
+        self._memoizable = True
+        self._memoizables = []
+        self._memo = {}
 
     def _dict(self):
-        return defaultdict(lambda: [])
+        return defaultdict(list)
 
     def push(self):
-        d = self._dict()
-        self.dicts.append(d)
-        return d
+        self.dicts.append(None)
+        self._versions.append(self.version)
+        self._memoizables.append(self._memoizable)
 
     def pop(self):
+        """
+        Removes the most recently pushed frame and returns it, or ``None``
+        if nothing was configured in it.
+        """
         if len(self.dicts) == 1:
             raise ConfigPopException
+        self.version = self._versions.pop()
+        self._memoizable = self._memoizables.pop()
         return self.dicts.pop()
 
     def configure(self, key, value, filter=None):
@@ -187,9 +228,44 @@ class FormConfig(object):
 
         """
         if filter is None:
-            def filter(**kwargs):
-                return True
-        self.dicts[-1][key].append((value, filter))
+            filter = match_all
+        d = self.dicts[-1]
+        if d is None:
+            d = self.dicts[-1] = self._dict()
+        d[key].append((value, filter))
+        self._last_version += 1
+        self.version = self._last_version
+        if not is_field_filter(filter):
+            self._memoizable = False
+
+    def _memo_key(self, key, kwargs):
+        if not self.version or not self._memoizable or len(kwargs) != 1:
+            return None
+        bound_field = kwargs.get('bound_field')
+        if bound_field is None:
+            return None
+        field = bound_field.field
+        return (self.version, key, bound_field.name, field.__class__,
+                field.widget.__class__)
+
+    def _retrieve_all(self, key, kwargs):
+        values = []
+        for d in self.dicts:
+            if not d or key not in d:
+                continue
+            for value, filter in d[key]:
+                if filter(**kwargs):
+                    values.append(value)
+        values.reverse()
+        return values
+
+    def _retrieve_memoized(self, key, memo_key, kwargs):
+        try:
+            return self._memo[memo_key]
+        except KeyError:
+            values = tuple(self._retrieve_all(key, kwargs))
+            self._memo[memo_key] = values
+            return values
 
     def retrieve(self, key, **kwargs):
         """
@@ -200,11 +276,22 @@ class FormConfig(object):
         ``self.defaults[key](**kwargs)``
 
         """
-        for d in reversed(self.dicts):
-            for value, filter in reversed(d[key]):
-                if filter(**kwargs):
-                    return value
-
+        memo_key = self._memo_key(key, kwargs)
+        if memo_key is not None:
+            values = self._retrieve_memoized(key, memo_key, kwargs)
+            if values:
+                return values[0]
+        else:
+            for d in reversed(self.dicts):
+                # Lookups don't use d[key], which would add the key.
+                if not d or key not in d:
+                    continue
+                for value, filter in reversed(d[key]):
+                    if filter(**kwargs):
+                        return value
+
+        # Defaults are never memoised, they depend on the bound field's
+        # instances.
         if key not in self.defaults:
             return None
         return self.defaults[key](**kwargs)
@@ -215,12 +302,81 @@ class FormConfig(object):
         most-recently-configured.
 
         """
-        values = []
-        for d in self.dicts:
-            for value, filter in d[key]:
-                if filter(**kwargs):
-                    values.insert(0, value)
-        return values
+        memo_key = self._memo_key(key, kwargs)
+        if memo_key is not None:
+            return list(self._retrieve_memoized(key, memo_key, kwargs))
+        return self._retrieve_all(key, kwargs)
+
+
+class SharedDatalists(object):
+    """
+    Collects the datalists of the widgets rendered inside a ``{% form ...
+    share_datalists %}`` tag. Widgets whose ``datalist`` is the very same
+    object share one ``<datalist>`` element, which is rendered once after the
+    forms.
+    """
+    def __init__(self):
+        self.datalists = {}
+        self.ids = set()
+
+    def register(self, bound_field, widget):
+        """
+        Returns the id of the shared ``<datalist>`` element for ``widget``.
+        """
+        # The ``id`` filter below shadows the builtin in this module.
+        key = builtins.id(widget.datalist)
+        if key in self.datalists:
+            return self.datalists[key][0]
+        # Like the ids of the datalists rendered with the widget, so that
+        # the ids don't collide across several share_datalists tags.
+        base_id = bound_field.auto_id or bound_field.html_name
+        datalist_id = base_id = '%s_list' % base_id
+        counter = 1
+        while datalist_id in self.ids:
+            counter += 1
+            datalist_id = '%s_%d' % (base_id, counter)
+        self.ids.add(datalist_id)
+        # Keep a reference to the datalist so that its id can't be reused.
+        self.datalists[key] = (datalist_id, widget, widget.datalist)
+        return datalist_id
+
+    def render(self):
+        return mark_safe('\n'.join(
+            widget.render_datalist(datalist_id)
+            for datalist_id, widget, datalist in self.datalists.values()))
+
+
+class FormRow(object):
+    """
+    The values the row templates show for ``field``, available as ``rows``
+    in the row templates. Each value is computed once, when it's used.
+    ``label`` is the label passed to the ``{% formrow %}`` tag, if any.
+    """
+    def __init__(self, field, label=None):
+        self.field = field
+        self.label = label or field.label
+
+    @cached_property
+    def label_id(self):
+        return id(self.field)
+
+    @cached_property
+    def label_with_suffix(self):
+        label = self.label
+        if not label or str(label)[-1] in '.:!?':
+            return label
+        suffix = self.field.field.label_suffix
+        if suffix is None:
+            suffix = self.field.form.label_suffix
+        return format_html('{}{}', label, suffix)
+
+    @cached_property
+    def classes(self):
+        return self.field.css_classes()
+
+
+def form_rows(fields, label=None):
+    return [FormRow(field, label) for field in fields]
 
 
 class BaseFormNode(Node):
@@ -229,6 +385,7 @@ class BaseFormNode(Node):
     arguments like "using <template>" and "with <context>" in a standard way.
     """
     CONFIG_CONTEXT_ATTR = '_form_config'
+    DATALISTS_CONTEXT_ATTR = '_form_datalists'
     IN_FORM_CONTEXT_VAR = '_form_render'
 
     optional_using_parameter = False
@@ -236,6 +393,8 @@ class BaseFormNode(Node):
     accept_only_parameter = True
     accept_for_parameter = False
     optional_for_parameter = False
+    # Keywords that may be given at the very end of the tag.
+    flags = ()
 
     form_config = FormConfig
     single_template_var = None
@@ -318,6 +477,13 @@ class BaseFormNode(Node):
                 raise TemplateSyntaxError('Unknown argument for %s tag: %r.' %
                                           (tagname, bits[0]))
 
+    @classmethod
+    def parse_flags(cls, tagname, parser, bits, options):
+        for flag in cls.flags:
+            options[flag] = False
+        while len(bits) > 1 and bits[-1] in cls.flags:
+            options[bits.pop()] = True
+
     @classmethod
     def parse(cls, parser, tokens):
         bits = tokens.split_contents()
@@ -327,6 +493,7 @@ class BaseFormNode(Node):
             'with': None,
         }
 
+        cls.parse_flags(tagname, parser, bits, options)
         variables = cls.parse_variables(tagname, parser, bits, options)
         cls.parse_using(tagname, parser, bits, options)
         cls.parse_with(tagname, parser, bits, options)
@@ -535,22 +702,18 @@ class BaseFormRenderNode(BaseFormNode):
 
         config = self.get_config(context)
         config.push()
+        try:
+            extra_context = self.get_extra_context(context)
+            nodelist = self.get_nodelist(context, extra_context)
+            if nodelist is None:
+                return ''
 
-        extra_context = self.get_extra_context(context)
-        nodelist = self.get_nodelist(context, extra_context)
-        if nodelist is None:
-            return ''
-
-        if only:
-            context = context.new(extra_context)
-            output = nodelist.render(context)
-        else:
-            context.update(extra_context)
-            output = nodelist.render(context)
-            context.pop()
-
-        config.pop()
-        return output
+            if only:
+                return nodelist.render(context.new(extra_context))
+            with context.push(extra_context):
+                return nodelist.render(context)
+        finally:
+            config.pop()
 
 
 class FormNode(BaseFormRenderNode):
@@ -560,6 +723,26 @@ class FormNode(BaseFormRenderNode):
     single_template_var = 'form'
     list_template_var = 'forms'
 
+    flags = ('share_datalists',)
+
+    def render(self, context):
+        with memoize_hidden_field_errors():
+            return self.render_form(context)
+
+    def render_form(self, context):
+        if not self.options.get('share_datalists'):
+            return super(FormNode, self).render(context)
+        if hasattr(context, self.DATALISTS_CONTEXT_ATTR):
+            # An outer form tag already collects the datalists.
+            return super(FormNode, self).render(context)
+        datalists = SharedDatalists()
+        setattr(context, self.DATALISTS_CONTEXT_ATTR, datalists)
+        try:
+            output = super(FormNode, self).render(context)
+        finally:
+            delattr(context, self.DATALISTS_CONTEXT_ATTR)
+        return output + datalists.render()
+
     def is_list_variable(self, var):
         if not hasattr(var, '__iter__'):
             return False
@@ -629,19 +812,99 @@ class FormRowNode(BaseFormRenderNode):
         for extra in reversed(config.retrieve_all('row_context')):
             configured_context.update(extra)
         configured_context.update(extra_context)
+        if 'label' in configured_context:
+            label = configured_context['label']
+        elif not self.options['only']:
+            label = context.get('label')
+        else:
+            label = None
+        configured_context['rows'] = form_rows(
+            configured_context[self.list_template_var], label)
         return configured_context
 
 
 @contextmanager
 def attributes(widget, **kwargs):
+    """
+    Sets attributes on ``widget`` while the block runs. The previous
+    instance attributes are restored afterwards, even if the block raises,
+    and attributes that only existed on the class are deleted again so that
+    ``widget`` keeps no reference to the values.
+
+    Deprecated, the template tags pass these values to ``render()`` instead.
+    """
+    warnings.warn('floppyforms.templatetags.floppyforms.attributes() is '
+                  'deprecated and will be removed.', DeprecationWarning,
+                  stacklevel=3)
     old = {}
     for name, value in kwargs.items():
-        old[name] = getattr(widget, name, empty)
+        old[name] = vars(widget).get(name, empty)
         setattr(widget, name, value)
-    yield widget
-    for name, value in old.items():
-        if value is not empty:
+    try:
+        yield widget
+    finally:
+        for name, value in old.items():
+            if value is empty:
+                delattr(widget, name)
+            else:
+                setattr(widget, name, value)
+
+
+RENDER_PARAMETERS = frozenset(['template_name', 'context_instance',
+                               'datalist_id'])
+
+_accepts_render_parameters = {}
+
+
+def accepts_render_parameters(widget):
+    """
+    Returns whether ``widget.render()`` takes the ``template_name``,
+    ``context_instance`` and ``datalist_id`` arguments, like
+    ``floppyforms.widgets.Input.render()`` does. They have to be named in
+    the signature: ``**kwargs`` alone may not pass them on. The result is
+    cached per widget class.
+    """
+    widget_class = widget.__class__
+    try:
+        return _accepts_render_parameters[widget_class]
+    except KeyError:
+        pass
+    try:
+        parameters = inspect.signature(widget.render).parameters.values()
+    except (TypeError, ValueError):
+        accepts = False
+    else:
+        accepts = RENDER_PARAMETERS <= set(p.name for p in parameters)
+    _accepts_render_parameters[widget_class] = accepts
+    return accepts
+
+
+def render_widget(bound_field, widget, **parameters):
+    """
+    Renders ``bound_field`` with ``widget`` like ``BoundField.as_widget()``
+    and passes ``parameters`` (see ``RENDER_PARAMETERS``) on to
+    ``widget.render()``. Widgets that don't take these arguments are
+    rendered as a copy with the parameters set as attributes. Neither way
+    modifies ``widget``, which may be shared by forms in other threads.
+    """
+    if not accepts_render_parameters(widget):
+        widget = copy.copy(widget)
+        for name, value in parameters.items():
             setattr(widget, name, value)
+        return bound_field.as_widget(widget=widget)
+
+    if bound_field.field.localize and not widget.is_localized:
+        widget = copy.copy(widget)
+        widget.is_localized = True
+    attrs = bound_field.build_widget_attrs({}, widget)
+    if bound_field.auto_id and 'id' not in widget.attrs:
+        attrs.setdefault('id', bound_field.auto_id)
+    return widget.render(
+        name=bound_field.html_name,
+        value=bound_field.value(),
+        attrs=attrs,
+        renderer=bound_field.form.renderer,
+        **parameters)
 
 
 class FormFieldNode(BaseFormRenderNode):
@@ -664,6 +927,11 @@ class FormFieldNode(BaseFormRenderNode):
         configured_context.update(extra_context)
         return configured_context
 
+    def shares_datalist(self, widget):
+        if getattr(widget, 'datalist', None) is None:
+            return False
+        return getattr(widget, 'datalist_id', None) is None
+
     def render(self, context):
         config = self.get_config(context)
 
@@ -682,24 +950,31 @@ class FormFieldNode(BaseFormRenderNode):
                 template_name = self.options['using'].resolve(context)
             except VariableDoesNotExist:
                 return raise_or_not_variable_does_not_exist_compat_version(context)
+        parameters = {
+            'template_name': template_name,
+        }
+        datalists = getattr(context, self.DATALISTS_CONTEXT_ATTR, None)
+        if datalists is not None and self.shares_datalist(widget):
+            parameters['datalist_id'] = datalists.register(bound_field,
+                                                           widget)
+
         if self.options['only']:
             context_instance = context.new(extra_context)
         else:
             context.update(extra_context)
             context_instance = context
 
+        # The context is only passed to render(), never stored on the
+        # widget, and is restored even if rendering fails.
         config.push()
-
-        # Using a context manager here until Django's BoundField takes
-        # template name and context instance parameters
-        with attributes(widget, template_name=template_name,
-                        context_instance=context_instance) as widget:
-            output = bound_field.as_widget(widget=widget)
-
-        config.pop()
-
-        if not self.options['only']:
-            context.pop()
+        try:
+            output = render_widget(bound_field, widget,
+                                   context_instance=context_instance,
+                                   **parameters)
+        finally:
+            config.pop()
+            if not self.options['only']:
+                context.pop()
 
         if bound_field.field.show_hidden_initial:
             return output + bound_field.as_hidden(only_initial=True)
@@ -740,10 +1015,8 @@ class WidgetNode(Node):
             template = 'floppyforms/dummy.html'
 
         template = get_template(context, template)
-        context.update(widget_ctx)
-        rendered = template.render(context)
-        context.pop()
-        return rendered
+        with context.push(widget_ctx):
+            return template.render(context)
 
     @classmethod
     def parse(cls, parser, tokens):
@@ -754,14 +1027,120 @@ class WidgetNode(Node):
         return cls(field)
 
 
+ERRORS_TEMPLATE_NAME = 'floppyforms/errors.html'
+
+
+def get_errors_template_name(is_bundled=is_bundled_template):
+    """
+    Returns the name of the template ``{% formerrors %}`` renders the errors
+    with: the ``FLOPPYFORMS_ERRORS_TEMPLATE`` setting, or
+    ``floppyforms/errors.html`` if the project overrides it. Returns ``None``
+    to render them with ``render_errors()``.
+    """
+    template_name = getattr(settings, 'FLOPPYFORMS_ERRORS_TEMPLATE', None)
+    if template_name is None and not is_bundled(ERRORS_TEMPLATE_NAME):
+        template_name = ERRORS_TEMPLATE_NAME
+    return template_name
+
+
+def render_errors(errors):
+    """
+    Renders ``errors`` like the ``floppyforms/errors.html`` template, without
+    loading a template.
+    """
+    if not errors:
+        return ''
+    return format_html('<ul class="errorlist">{}</ul>', format_html_join(
+        '', '<li>{}</li>', ((error,) for error in errors)))
+
+
+class FormErrorsNode(Node):
+    """
+    {% formerrors <errors> %}
+
+    Renders a list of errors with ``render_errors()``, or with the template
+    returned by ``get_errors_template_name()``, which gets the list as
+    ``errors``.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+
+    def render(self, context):
+        errors = self.errors.resolve(context)
+        template_name = get_errors_template_name()
+        if template_name is None:
+            return render_errors(errors)
+        template = get_template(context, template_name)
+        with context.push(errors=errors):
+            return template.render(context)
+
+    @classmethod
+    def parse(cls, parser, tokens):
+        bits = tokens.split_contents()
+        if len(bits) != 2:
+            raise TemplateSyntaxError("{% formerrors %} takes one and only one argument")
+        return cls(parser.compile_filter(bits[1]))
+
+
+# The memo of the hidden_field_errors filter. Filters don't get the template
+# context, so it's thread-local instead of being stored in the render
+# context.
+_hidden_field_errors = threading.local()
+
+
+@contextmanager
+def memoize_hidden_field_errors():
+    """
+    Memoises the ``hidden_field_errors`` filter per form while the block
+    runs. The form tags render their content in this block, nested blocks
+    share the outermost one's memo.
+
+    The memo is per thread, not per render: another template rendered on
+    the same thread while the block runs, e.g. by a widget, shares it too.
+    Errors added to a form during that time aren't seen by the filter.
+    """
+    if getattr(_hidden_field_errors, 'memo', None) is not None:
+        yield
+        return
+    _hidden_field_errors.memo = {}
+    try:
+        yield
+    finally:
+        _hidden_field_errors.memo = None
+
+
 @register.filter
 def hidden_field_errors(form):
+    """
+    Returns the errors of the hidden fields of ``form``. Inside a form tag
+    the result is memoised per form and thread, see
+    ``memoize_hidden_field_errors()``.
+    """
+    memo = getattr(_hidden_field_errors, 'memo', None)
+    if memo is not None:
+        # Keep a reference to the form so that its id can't be reused.
+        memoized_form, errors = memo.get(builtins.id(form), (None, None))
+        if memoized_form is form:
+            return errors
     hidden_field_errors = ErrorList()
     for field in form.hidden_fields():
         hidden_field_errors.extend(field.errors)
+    if memo is not None:
+        memo[builtins.id(form)] = (form, hidden_field_errors)
     return hidden_field_errors
 
 
+@register.filter
+def top_errors(form):
+    """
+    Returns the non-field errors of ``form`` followed by the errors of its
+    hidden fields, the errors the layouts show above the rows.
+    """
+    errors = form.non_field_errors().copy()
+    errors.extend(hidden_field_errors(form))
+    return errors
+
+
 @register.filter
 def id(bound_field):
     widget = bound_field.field.widget
@@ -776,3 +1155,4 @@ register.tag('form', FormNode.parse)
 register.tag('formrow', FormRowNode.parse)
 register.tag('formfield', FormFieldNode.parse)
 register.tag('widget', WidgetNode.parse)
+register.tag('formerrors', FormErrorsNode.parse)
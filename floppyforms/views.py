@@ -0,0 +1,80 @@
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.http import JsonResponse
+from django.utils.encoding import force_str
+from django.views.generic import View
+
+from .models import keyset_page
+
+
+__all__ = ('ModelChoicesView',)
+
+
+class ModelChoicesView(View):
+    """
+    Serves the choices of a model choice field as JSON, one page at a time.
+    This is the companion view to ``floppyforms.WindowedSelect``.
+
+    Either set ``field`` to the form field whose choices should be served
+    or ``queryset`` to serve its objects directly::
+
+        path('authors/choices/', ModelChoicesView.as_view(
+            field=BookForm.base_fields['author'])),
+
+    The ``after`` GET parameter is the value of the last option already
+    known to the client. The response looks like::
+
+        {"results": [{"value": "3", "label": "Ada"}, ...], "next": "52"}
+
+    where ``next`` is ``null`` on the last page.
+    """
+    field = None
+    queryset = None
+    to_field_name = None
+    paginate_by = 100
+    max_paginate_by = 1000
+
+    def get_queryset(self):
+        if self.queryset is not None:
+            return self.queryset.all()
+        if self.field is not None:
+            return self.field.queryset.all()
+        raise ImproperlyConfigured(
+            '%s requires either a field or a queryset.' %
+            self.__class__.__name__)
+
+    def get_key(self):
+        if self.to_field_name is not None:
+            return self.to_field_name
+        if self.field is not None and self.field.to_field_name:
+            return self.field.to_field_name
+        return 'pk'
+
+    def get_paginate_by(self):
+        try:
+            limit = int(self.request.GET.get('limit', self.paginate_by))
+        except ValueError:
+            limit = self.paginate_by
+        return max(1, min(limit, self.max_paginate_by))
+
+    def label_from_instance(self, obj):
+        if self.field is not None:
+            return self.field.label_from_instance(obj)
+        return force_str(obj)
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_key()
+        after = request.GET.get('after') or None
+        try:
+            objects, next_key = keyset_page(self.get_queryset(), key,
+                                            after=after,
+                                            limit=self.get_paginate_by())
+        except (ValueError, TypeError, ValidationError):
+            return JsonResponse({'error': 'Invalid "after" value.'},
+                                status=400)
+        results = [{
+            'value': force_str(obj.serializable_value(key)),
+            'label': force_str(self.label_from_instance(obj)),
+        } for obj in objects]
+        if next_key is not None:
+            next_key = force_str(next_key)
+        return JsonResponse({'results': results, 'next': next_key})
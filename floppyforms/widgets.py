@@ -6,15 +6,14 @@ import django
 from django import forms
 from django.conf import settings
 from django.forms.widgets import FILE_INPUT_CONTRADICTION
-from django.template import loader
-from django.utils import datetime_safe, formats
+from django.utils import datetime_safe, formats, translation
 from django.utils.dates import MONTHS
 from django.utils.encoding import force_str
-from django.utils.html import conditional_escape
+from django.utils.html import conditional_escape, format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
-from .compat import MULTIVALUE_DICT_TYPES, flatten_contexts
+from .compat import MULTIVALUE_DICT_TYPES, flatten_contexts, render_to_string
 
 
 from django.forms.utils import to_current_timezone
@@ -69,13 +68,18 @@ class Widget(forms.Widget):
 
 class Input(Widget):
     template_name = 'floppyforms/input.html'
+    datalist_options_template_name = 'floppyforms/datalist_options.html'
     input_type = None
     datalist = None
+    datalist_id = None
 
     def __init__(self, *args, **kwargs):
         datalist = kwargs.pop('datalist', None)
         if datalist is not None:
             self.datalist = datalist
+        datalist_id = kwargs.pop('datalist_id', None)
+        if datalist_id is not None:
+            self.datalist_id = datalist_id
         template_name = kwargs.pop('template_name', None)
         if template_name is not None:
             self.template_name = template_name
@@ -83,10 +87,39 @@ class Input(Widget):
         # This attribute is used to inject a surrounding context in the
         # floppyforms templatetags, when rendered inside a complete form.
         self.context_instance = None
+        # Rendered datalist options per language. Widgets are only shallow
+        # copied for every form instance, so all copies share this cache.
+        self._datalist_cache = {}
 
     def get_context_data(self):
         return {}
 
+    def render_datalist_options(self):
+        """
+        Returns the rendered ``<option>`` elements of ``self.datalist``. They
+        are rendered once per language and reused as long as the
+        ``datalist`` attribute points to the same object.
+        """
+        datalist = self.datalist
+        language = translation.get_language()
+        cached = self._datalist_cache.get(language)
+        if cached is not None and cached[0] is datalist:
+            return cached[1]
+        options = render_to_string(self.datalist_options_template_name,
+                                   {'datalist': datalist})
+        self._datalist_cache[language] = (datalist, options)
+        return options
+
+    def render_datalist(self, datalist_id=None):
+        """
+        Returns the ``<datalist>`` element for this widget. Use it together
+        with ``datalist_id`` to render a datalist only once per page and let
+        all inputs refer to it.
+        """
+        return format_html('<datalist id="{}">{}\n</datalist>',
+                           datalist_id or self.datalist_id,
+                           self.render_datalist_options())
+
     def format_value(self, value):
         if self.is_localized:
             value = formats.localize_input(value)
@@ -127,15 +160,28 @@ class Input(Widget):
 
         if self.datalist is not None:
             context['datalist'] = self.datalist
+            context['datalist_id'] = self.datalist_id
+            if self.datalist_id is None:
+                context['datalist_options'] = self.render_datalist_options()
         return context
 
-    def render(self, name, value, attrs=None, **kwargs):
-        template_name = kwargs.pop('template_name', None)
+    def render(self, name, value, attrs=None, template_name=None,
+               context_instance=None, datalist_id=None, **kwargs):
+        """
+        ``template_name``, ``context_instance`` and ``datalist_id`` override
+        the widget attributes of the same name for this call. The widget is
+        not modified, so it can be rendered by several threads at once.
+        """
         if template_name is None:
             template_name = self.template_name
+        if context_instance is None:
+            context_instance = self.context_instance
         context = self.get_context(name, value, attrs=attrs or {})
-        context = flatten_contexts(self.context_instance, context)
-        return loader.render_to_string(template_name, context)
+        if datalist_id is not None and 'datalist' in context:
+            context['datalist_id'] = datalist_id
+            context.pop('datalist_options', None)
+        context = flatten_contexts(context_instance, context)
+        return render_to_string(template_name, context, context_instance)
 
 
 class TextInput(Input):
@@ -156,10 +202,14 @@ class PasswordInput(TextInput):
         super(PasswordInput, self).__init__(attrs)
         self.render_value = render_value
 
-    def render(self, name, value, attrs=None, renderer=None):
+    def render(self, name, value, attrs=None, template_name=None,
+               context_instance=None, datalist_id=None, **kwargs):
         if not self.render_value:
             value = None
-        return super(PasswordInput, self).render(name, value, attrs, renderer=renderer)
+        return super(PasswordInput, self).render(
+            name, value, attrs, template_name=template_name,
+            context_instance=context_instance, datalist_id=datalist_id,
+            **kwargs)
 
 
 class HiddenInput(Input):
@@ -224,11 +274,15 @@ class FileInput(Input):
     needs_multipart_form = True
     omit_value = True
 
-    def render(self, name, value, attrs=None, renderer=None):
+    def render(self, name, value, attrs=None, template_name=None,
+               context_instance=None, datalist_id=None, **kwargs):
         if self.omit_value:
             # File inputs can't render an existing value if it's not saved
             value = None
-        return super(FileInput, self).render(name, value, attrs=attrs, renderer=renderer)
+        return super(FileInput, self).render(
+            name, value, attrs=attrs, template_name=template_name,
+            context_instance=context_instance, datalist_id=datalist_id,
+            **kwargs)
 
     def value_from_datadict(self, data, files, name):
         return files.get(name, None)
@@ -271,8 +325,10 @@ class ClearableFileInput(FileInput):
         upload = super(ClearableFileInput, self).value_from_datadict(
             data, files, name
         )
-        if not self.is_required and CheckboxInput().value_from_datadict(
-            data, files, self.clear_checkbox_name(name)
+        # Django's implementation doesn't use the widget instance, so there
+        # is no need to create a new CheckboxInput for every call.
+        if not self.is_required and forms.CheckboxInput.value_from_datadict(
+            self, data, files, self.clear_checkbox_name(name)
         ):
             if upload:
                 return FILE_INPUT_CONTRADICTION
@@ -511,28 +567,64 @@ class Select(Input):
         #       (value4, label4),
         #   ]),
         # )
+        # 'optgroups_selected' has the same structure, with a third item
+        # telling whether the option is selected.
+        selected = context.get('value') or ()
+        if isinstance(selected, str):
+            selected = (selected,)
+        if not isinstance(selected, (set, frozenset)):
+            selected = set(selected)
         groups = []
-        for option_value, option_label in chain(self.choices, choices):
+        selected_groups = []
+        for option_value, option_label in self.get_choices(value, choices):
             if isinstance(option_label, (list, tuple)):
                 group = []
+                selected_group = []
                 for val, lab in option_label:
-                    group.append((force_str(val), lab))
+                    val = force_str(val)
+                    group.append((val, lab))
+                    selected_group.append((val, lab, val in selected))
                 groups.append((option_value, group))
+                selected_groups.append((option_value, selected_group))
             else:
                 option_value = force_str(option_value)
+                option = (option_value, option_label)
+                selected_option = (option_value, option_label,
+                                   option_value in selected)
                 if groups and groups[-1][0] is None:
-                    groups[-1][1].append((option_value, option_label))
+                    groups[-1][1].append(option)
+                    selected_groups[-1][1].append(selected_option)
                 else:
-                    groups.append((None, [(option_value, option_label)]))
+                    groups.append((None, [option]))
+                    selected_groups.append((None, [selected_option]))
         context["optgroups"] = groups
+        context["optgroups_selected"] = selected_groups
         return context
 
+    def get_choices(self, value, choices=()):
+        """
+        Returns the iterable of ``(value, label)`` choices to render.
+        ``value`` is the list of raw values the widget is rendered with.
+        """
+        return chain(self.choices, choices)
+
     def format_value(self, value):
         if len(value) == 1 and value[0] is None:
             return []
         return set(force_str(v) for v in value)
 
 
+NULL_BOOLEAN_CHOICES = {True: '2', False: '3', '2': '2', '3': '3'}
+NULL_BOOLEAN_VALUES = {
+    '2': True,
+    True: True,
+    'True': True,
+    '3': False,
+    'False': False,
+    False: False,
+}
+
+
 class NullBooleanSelect(Select):
     def __init__(self, attrs=None):
         choices = (('1', _('Unknown')),
@@ -541,21 +633,13 @@ class NullBooleanSelect(Select):
         super(NullBooleanSelect, self).__init__(attrs, choices)
 
     def format_value(self, value):
-        value = value[0]
         try:
-            value = {True: '2', False: '3', '2': '2', '3': '3'}[value]
+            return NULL_BOOLEAN_CHOICES[value[0]]
         except KeyError:
-            value = '1'
-        return value
+            return '1'
 
     def value_from_datadict(self, data, files, name):
-        value = data.get(name, None)
-        return {'2': True,
-                True: True,
-                'True': True,
-                '3': False,
-                'False': False,
-                False: False}.get(value, None)
+        return NULL_BOOLEAN_VALUES.get(data.get(name, None), None)
 
     if django.VERSION < (1, 6):
         def _has_changed(self, initial, data):
@@ -737,6 +821,7 @@ class SelectDateWidget(forms.Widget):
     day_field = '%s_day'
     year_field = '%s_year'
     template_name = 'floppyforms/select_date.html'
+    context_instance = None
 
     def __init__(self, attrs=None, years=None, required=True):
         # years is an optional list/tuple of years to use in the
@@ -779,7 +864,8 @@ class SelectDateWidget(forms.Widget):
         context['attrs'] = attrs
         return context
 
-    def render(self, name, value, attrs=None, extra_context={}, renderer=None):
+    def render(self, name, value, attrs=None, extra_context={}, renderer=None,
+               template_name=None, context_instance=None, **kwargs):
         try:
             year_val, month_val, day_val = value.year, value.month, value.day
         except AttributeError:
@@ -824,7 +910,11 @@ class SelectDateWidget(forms.Widget):
             context['month_choices'].insert(0, self.none_value)
             context['day_choices'].insert(0, self.none_value)
 
-        return loader.render_to_string(self.template_name, context)
+        if template_name is None:
+            template_name = self.template_name
+        if context_instance is None:
+            context_instance = self.context_instance
+        return render_to_string(template_name, context, context_instance)
 
     def value_from_datadict(self, data, files, name):
         y = data.get(self.year_field % name)
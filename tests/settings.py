@@ -54,6 +54,20 @@ TEMPLATES = [
     },
 ]
 
+try:
+    import jinja2  # noqa
+except ImportError:
+    pass
+else:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'NAME': 'jinja2',
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'extensions': ['floppyforms.jinja2ext.floppyforms'],
+        },
+    })
+
 
 import django
 if django.VERSION < (1, 6):
@@ -1,7 +1,7 @@
 import warnings
 
 import django.forms
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 import floppyforms as forms
 from .models import Registration
@@ -26,3 +26,27 @@ class ModelFormDeprecationTests(TestCase):
 
         self.assertFalse(isinstance(modelform.base_fields['firstname'], forms.CharField))
         self.assertIsInstance(modelform.base_fields['firstname'], django.forms.CharField)
+
+    def test_model_form_warns_once_per_class(self):
+        class RegistrationModelForm(forms.ModelForm):
+            class Meta:
+                model = Registration
+                fields = ('firstname',)
+
+        with warnings.catch_warnings(record=True) as w:
+            RegistrationModelForm()
+            RegistrationModelForm()
+            self.assertEqual(len(w), 1)
+
+    @override_settings(FLOPPYFORMS_FUTURE_MODELFORMS=True)
+    def test_future_modelforms_setting(self):
+        class RegistrationModelForm(forms.ModelForm):
+            class Meta:
+                model = Registration
+                fields = ('firstname',)
+
+        with warnings.catch_warnings(record=True) as w:
+            modelform = RegistrationModelForm()
+            self.assertEqual(len(w), 0)
+
+        self.assertIsInstance(modelform.base_fields['firstname'], forms.CharField)
@@ -1,12 +1,14 @@
 from decimal import Decimal
 import django
 from django.core.exceptions import ValidationError
+from django.template import TemplateDoesNotExist
 from django.test import TestCase
 
 from django.utils import translation
 from django.utils.translation import gettext_lazy as _
 
 import floppyforms.__future__ as forms
+from floppyforms.compat import bundled_templates
 
 from .compat import unittest
 from .models import Registration
@@ -98,6 +100,57 @@ class FormRenderAsMethodsTests(TestCase):
             rendered = form.as_ul()
             self.assertTrue(' name="firstname"' in rendered)
 
+    def test_render_as_template(self):
+        form = RegistrationForm(data={'firstname': 'Jane'})
+        with self.assertTemplateNotUsed('floppyforms/_render_as.html'):
+            rendered = form.as_p()
+        with self.assertTemplateUsed('floppyforms/_render_as.html'):
+            with self.settings(TEMPLATES=[{
+                'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                'DIRS': [],
+                'OPTIONS': {'loaders': [
+                    ('django.template.loaders.locmem.Loader', {
+                        'floppyforms/_render_as.html':
+                            '{% load floppyforms %}{% form form using layout %}',
+                    }),
+                    'django.template.loaders.app_directories.Loader',
+                ]},
+            }]):
+                self.assertHTMLEqual(form.as_p(), rendered)
+
+        class CustomForm(RegistrationForm):
+            _render_as_template_name = 'custom_render_as.html'
+
+        rendered = CustomForm().as_p()
+        self.assertTrue(rendered.startswith('<div class="custom">'))
+        self.assertTrue(' name="firstname"' in rendered)
+
+    def test_render_as_missing_layout(self):
+        form = RegistrationForm()
+        self.assertEqual(form._render_as('missing_layout.html'), '')
+        with self.settings(TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'APP_DIRS': True,
+            'OPTIONS': {'debug': True},
+        }]):
+            with self.assertRaises(TemplateDoesNotExist):
+                form._render_as('missing_layout.html')
+
+    def test_render_as_template_memoised_with_cached_loader(self):
+        form = RegistrationForm()
+        form.as_p()
+        self.assertTrue(
+            bundled_templates['floppyforms/_render_as.html'])
+        with self.settings(TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'OPTIONS': {'loaders': [
+                'django.template.loaders.app_directories.Loader',
+            ]},
+        }]):
+            form.as_p()
+            self.assertNotIn('floppyforms/_render_as.html',
+                             bundled_templates)
+
 
 class FormHasChangedTests(TestCase):
     def test_basic_has_changed(self):
@@ -1,6 +1,9 @@
 from django.conf import settings
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import translation
+from django.utils.html import conditional_escape
 from django.utils.functional import wraps
+from unittest.mock import patch
 
 try:
     from django.contrib.gis.geos import GEOSGeometry
@@ -10,6 +13,8 @@ except (ImportError, Exception):
     GEOSGeometry = None  # noqa
 
 import floppyforms as forms
+from floppyforms.geometry import (parse_wkt_header, pack_full_value,
+                                  unpack_full_value)
 
 from .compat import unittest
 
@@ -98,6 +103,70 @@ def skipUnlessGisAvailable():
     return _deferredSkip(condition, "GEOSGeometry could not be imported")
 
 
+class GeometryHelpersTests(SimpleTestCase):
+    """Tests for the helpers of the geometry widgets that don't need GDAL"""
+
+    def test_wkt_header(self):
+        self.assertEqual(parse_wkt_header('SRID=4326;POINT (1 2)'),
+                         (4326, 'POINT', 'POINT (1 2)'))
+        self.assertEqual(parse_wkt_header(' multipolygon Z (((1 2 3))) \n'),
+                         (None, 'MULTIPOLYGON', 'multipolygon Z (((1 2 3)))'))
+        self.assertEqual(parse_wkt_header('SRID=3857;POINT EMPTY'),
+                         (3857, 'POINT', ''))
+        self.assertEqual(parse_wkt_header('MULTIPOINT (1 2, 3 4)')[2],
+                         'MULTIPOINT (1 2, 3 4)')
+        self.assertEqual(parse_wkt_header('MULTIPOINT ((1 2), (3 4))')[2],
+                         'MULTIPOINT ((1 2), (3 4))')
+        self.assertEqual(
+            parse_wkt_header('POLYGON((0 0,1e3 0,-.5 +1.5E-2,0 0))')[2],
+            'POLYGON((0 0,1e3 0,-.5 +1.5E-2,0 0))')
+        self.assertEqual(parse_wkt_header('some invalid geom'), None)
+        self.assertEqual(
+            parse_wkt_header('0101000000000000000000F03F0000000000000040'),
+            None)
+
+    def test_full_value(self):
+        ewkb = b'\x01' * 1000
+        full_value = pack_full_value('POINT (1 2)', ewkb)
+        self.assertEqual(unpack_full_value(full_value, 'POINT (1 2)', 1000),
+                         ewkb)
+        # Line breaks added by the browser.
+        self.assertEqual(
+            unpack_full_value(full_value, '\r\nPOINT (1 2)\r\n', 1000),
+            ewkb)
+        # The displayed value was edited.
+        self.assertEqual(unpack_full_value(full_value, 'POINT (1 3)', 1000),
+                         None)
+        digest = full_value.split(':')[0]
+        for broken in ('', 'no digest', digest + ':not base64',
+                       digest + ':bm90IHpsaWI=', full_value[:-8]):
+            self.assertEqual(
+                unpack_full_value(broken, 'POINT (1 2)', 1000), None, broken)
+
+    def test_full_value_size(self):
+        full_value = pack_full_value('POINT (1 2)', b'\x01' * 1000)
+        self.assertEqual(unpack_full_value(full_value, 'POINT (1 2)', 999),
+                         None)
+        self.assertEqual(unpack_full_value(full_value, 'POINT (1 2)', 100),
+                         None)
+
+    def test_malformed_wkt_header(self):
+        for wkt in ('POINTS (1 2)',
+                    'POINT 1 2',
+                    'POINT Q (1 2)',
+                    'POINT EMPTY (1 2)',
+                    'SRID=;POINT (1 2)',
+                    'SRID=4326 POINT (1 2)',
+                    'LINESTRING;DROP'):
+            self.assertEqual(parse_wkt_header(wkt), None, wkt)
+        # The coordinates aren't checked, GeometryField validates them.
+        self.assertEqual(parse_wkt_header('POINT (1 2, x)')[2],
+                         'POINT (1 2, x)')
+        self.assertEqual(
+            parse_wkt_header('GEOMETRYCOLLECTION (POINT (1 2))')[1],
+            'GEOMETRYCOLLECTION')
+
+
 class GisTests(TestCase):
     """Tests for the GeoDjango widgets"""
 
@@ -312,3 +381,266 @@ class GisTests(TestCase):
         for invalid in invalid_geoms:
             data = {'g': GEOMETRIES()[invalid].wkt}
             self.assertFalse(GeometryForm(data=data).is_valid())
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_transform_cache(self):
+        from floppyforms.gis.widgets import TransformCache
+
+        class OsmPointWidget(forms.gis.PointWidget, forms.gis.BaseOsmWidget):
+            transform_cache = TransformCache()
+
+        widget = OsmPointWidget()
+        geom = GEOMETRIES()['point']
+        expected = geom.transform(3857, clone=True)
+        rendered = widget.render('p', geom)
+        self.assertEqual(len(widget.transform_cache.data), 1)
+        wkt = list(widget.transform_cache.data.values())[0]
+        self.assertTrue(GEOSGeometry(wkt, 3857).equals_exact(expected, 0.01))
+        self.assertTrue(wkt in rendered, rendered)
+
+        # An equal geometry is served from the cache.
+        with patch.object(GEOSGeometry, 'ogr') as ogr:
+            self.assertEqual(widget.render('p', GEOMETRIES()['point']),
+                             rendered)
+        self.assertFalse(ogr.mock_calls)
+
+        # Same coordinates, different source SRID.
+        other = GEOMETRIES()['point']
+        other.srid = 4269
+        widget.render('p', other)
+        self.assertEqual(len(widget.transform_cache.data), 2)
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_transform_cache_eviction(self):
+        from floppyforms.gis.widgets import TransformCache
+
+        cache = TransformCache(maxbytes=100)
+        cache.add('a', 'x' * 40)
+        cache.add('b', 'x' * 40)
+        cache.add('too big', 'x' * 101)
+        self.assertEqual(list(cache.data), ['a', 'b'])
+        cache.transform(GEOMETRIES()['point'], 3857)
+        self.assertEqual(len(cache.data), 2)
+        self.assertFalse('a' in cache.data)
+        self.assertTrue(cache.currbytes <= 100)
+
+        cache.clear()
+        self.assertEqual(len(cache.data), 0)
+        self.assertEqual(cache.currbytes, 0)
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_string_value_pass_through(self):
+        widget = forms.gis.PolygonWidget()
+        wkt = GEOMETRIES()['polygon'].wkt
+        with patch('floppyforms.gis.widgets.geos.GEOSGeometry') as geometry:
+            # As posted by MapWidget.js, and plain WKT.
+            self.assertEqual(widget.get_wkt('SRID=4326;%s' % wkt), wkt)
+            self.assertEqual(widget.get_wkt(wkt), wkt)
+            self.assertEqual(widget.get_wkt('SRID=4326;POLYGON EMPTY'), '')
+            self.assertEqual(
+                widget.get_wkt(GEOMETRIES()['multipolygon'].wkt), '')
+        self.assertFalse(geometry.mock_calls)
+        self.assertTrue(wkt in widget.render('p', 'SRID=4326;%s' % wkt))
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_string_value_transformed(self):
+        widget = forms.gis.PointWidget()
+        geom = GEOMETRIES()['point']
+        geom.transform(3857)
+        wkt = widget.get_wkt(geom.ewkt)
+        self.assertTrue(GEOSGeometry(wkt).equals_exact(GEOMETRIES()['point'],
+                                                       1e-6))
+        # Strings that aren't WKT still go through GEOS.
+        self.assertEqual(widget.get_wkt(GEOMETRIES()['point'].hex.decode()),
+                         GEOMETRIES()['point'].wkt)
+        self.assertEqual(widget.get_wkt('some invalid geom'), '')
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_simplify(self):
+        class PolygonForm(forms.Form):
+            p = forms.gis.PolygonField(widget=forms.gis.PolygonWidget(
+                attrs={'simplify_tolerance': 0.5}))
+
+        circle = GEOSGeometry('POINT (0 0)', 4326).buffer(10, 64)
+        widget = PolygonForm().fields['p'].widget
+        context = widget.get_context('p', circle, {'id': 'id_p'})
+        displayed = GEOSGeometry(context['value'])
+        self.assertTrue(displayed.num_coords < circle.num_coords / 4)
+        self.assertTrue(context['full_value'])
+        rendered = widget.render('p', circle, {'id': 'id_p'})
+        self.assertInHTML(
+            '<input type="hidden" name="p_full" id="id_p_full" value="%s">'
+            % context['full_value'], rendered)
+        self.assertTrue("full_value_id: 'id_p_full'," in rendered, rendered)
+
+        # Unchanged geometries are submitted in full precision.
+        data = {'p': context['value'],
+                'p_full': context['full_value']}
+        form = PolygonForm(data)
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.cleaned_data['p'].equals_exact(circle, 1e-9))
+        self.assertEqual(form.cleaned_data['p'].srid, 4326)
+
+        # Edited geometries, or broken full precision values.
+        for full_value in ('', 'not base64', 'bm90IHpsaWI='):
+            data['p_full'] = full_value
+            form = PolygonForm(data)
+            self.assertTrue(form.is_valid())
+            self.assertTrue(form.cleaned_data['p'].equals_exact(displayed))
+
+        # Edited without javascript, the hidden input is still set.
+        edited = GEOSGeometry('POLYGON ((0 0, 1 0, 1 1, 0 0))', 4326)
+        data = {'p': edited.wkt, 'p_full': context['full_value']}
+        form = PolygonForm(data)
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.cleaned_data['p'].equals_exact(edited))
+
+        # Points and simple geometries aren't simplified.
+        context = widget.get_context('p', GEOMETRIES()['polygon'], {})
+        self.assertEqual(context['value'], GEOMETRIES()['polygon'].wkt)
+        self.assertEqual(context['full_value'], None)
+        self.assertFalse('_full' in widget.render('p', GEOMETRIES()['polygon']))
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_simplify_cache(self):
+        from floppyforms.gis.widgets import GeometryCache
+
+        class CachedPolygonWidget(forms.gis.PolygonWidget):
+            simplify_cache = GeometryCache()
+
+        widget = CachedPolygonWidget(attrs={'simplify_tolerance': 0.5})
+        circle = GEOSGeometry('POINT (0 0)', 4326).buffer(10, 64)
+        rendered = widget.render('p', circle)
+        self.assertEqual(len(widget.simplify_cache.data), 1)
+        with patch.object(CachedPolygonWidget, 'simplify') as simplify:
+            self.assertEqual(widget.render('p', circle), rendered)
+        self.assertFalse(simplify.mock_calls)
+
+        # The wire format changes the displayed value.
+        widget = CachedPolygonWidget(attrs={'simplify_tolerance': 0.5,
+                                            'wire_format': 'hexwkb'})
+        widget.render('p', circle)
+        self.assertEqual(len(widget.simplify_cache.data), 2)
+
+        widget.simplify_cache = None
+        self.assertEqual(widget.get_context('p', circle, {})['full_value'],
+                         widget.get_display_value(circle.wkt)[1])
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_wire_formats(self):
+        for wire_format in ('wkt', 'hexwkb', 'base64wkb', 'geojson'):
+            class GeometryForm(forms.Form):
+                g = forms.gis.GeometryField(widget=forms.gis.GeometryWidget(
+                    attrs={'wire_format': wire_format}))
+
+            widget = GeometryForm().fields['g'].widget
+            for name, geom in GEOMETRIES().items():
+                value = widget.serialize(widget.get_wkt(geom))
+                self.assertTrue(
+                    widget.deserialize(value).equals_exact(geom, 1e-9),
+                    (wire_format, name, value))
+                self.assertEqual(widget.get_context('g', geom, {})['value'],
+                                 conditional_escape(value))
+
+                form = GeometryForm({'g': value})
+                self.assertTrue(form.is_valid(), (wire_format, name))
+                self.assertTrue(form.cleaned_data['g'].equals_exact(geom))
+                self.assertEqual(form.cleaned_data['g'].srid, 4326)
+                # Displayed again without a transformation.
+                self.assertEqual(form['g'].as_widget(), widget.render(
+                    'g', geom, {'id': 'id_g'}))
+
+            self.assertFalse(GeometryForm({'g': 'some invalid geom'}).is_valid())
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_wire_format_options(self):
+        widget = forms.gis.BaseOsmWidget(attrs={
+            'wire_format': 'geojson', 'coordinate_precision': 1})
+        self.assertEqual(widget.serialize('POINT (1.26 -2.01)'),
+                         '{"type":"Point","coordinates":[1.3,-2.0]}')
+        # GeoJSON coordinates are in the map's SRID, not in WGS84.
+        geometry = widget.deserialize(widget.serialize('POINT (1.26 2)'))
+        self.assertEqual(geometry.srid, 3857)
+        # EWKT keeps its SRID.
+        self.assertEqual(widget.deserialize('SRID=4326;POINT (1 2)').srid,
+                         4326)
+        self.assertTrue("wire_format: 'geojson'," in widget.render('g', None))
+        self.assertTrue('coordinate_precision: 1,' in widget.render('g', None))
+
+        widget = forms.gis.PointWidget(attrs={'coordinate_precision': 2})
+        self.assertEqual(widget.serialize('POINT (1.234 5.678)'),
+                         'POINT (1.23 5.68)')
+
+        with self.assertRaises(ValueError):
+            forms.gis.PointWidget(attrs={'wire_format': 'kml'})
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_static_context(self):
+        from floppyforms.gis import widgets
+
+        widgets.clear_static_contexts()
+        with patch.object(widgets.gdal, 'OGRGeomType',
+                          wraps=widgets.gdal.OGRGeomType) as geom_type:
+            for i in range(3):
+                context = forms.gis.PolygonWidget().get_context('p', None, {})
+                self.assertEqual(str(context['geom_type']), 'Polygon')
+            context = forms.gis.MultiPolygonWidget().get_context('p', None, {})
+            self.assertEqual(str(context['geom_type']), 'MultiPolygon')
+        self.assertEqual(geom_type.call_count, 2)
+
+        context = forms.gis.GeometryCollectionWidget().get_context(
+            'g', None, {})
+        self.assertEqual(context['geom_type'], 'Collection')
+        self.assertTrue(context['is_collection'])
+
+        with translation.override('he'):
+            self.assertTrue(forms.gis.PolygonWidget().get_context(
+                'p', None, {})['LANGUAGE_BIDI'])
+        with translation.override('en'):
+            self.assertFalse(forms.gis.PolygonWidget().get_context(
+                'p', None, {})['LANGUAGE_BIDI'])
+        with override_settings(STATIC_URL='/assets/'):
+            self.assertEqual(forms.gis.PolygonWidget().get_context(
+                'p', None, {})['ADMIN_MEDIA_PREFIX'], '/assets/admin/')
+        self.assertNotEqual(forms.gis.PolygonWidget().get_context(
+            'p', None, {})['ADMIN_MEDIA_PREFIX'], '/assets/admin/')
+
+    @skipUnlessInstalled('django.contrib.gis')
+    @skipUnlessGisAvailable()
+    def test_jinja2_templates(self):
+        from django.template import Context, Template, engines
+
+        if 'jinja2' not in [engine.name for engine in engines.all()]:
+            raise unittest.SkipTest('jinja2 is not installed')
+
+        class OSMPolygonWidget(forms.gis.PolygonWidget,
+                               forms.gis.BaseOsmWidget):
+            pass
+
+        class GMapPolygonWidget(forms.gis.PolygonWidget,
+                                forms.gis.BaseGMapWidget):
+            pass
+
+        class MapForm(forms.Form):
+            osm = forms.gis.PolygonField(widget=OSMPolygonWidget)
+            gmap = forms.gis.PolygonField(widget=GMapPolygonWidget(attrs={
+                'coordinate_precision': 3,
+            }))
+
+        polygon = GEOMETRIES()['polygon']
+        form = MapForm(initial={'osm': polygon, 'gmap': polygon})
+        for field in form:
+            self.assertHTMLEqual(
+                engines['jinja2'].from_string(
+                    '{% formfield field %}').render({'field': field}),
+                Template('{% load floppyforms %}{% formfield field %}').render(
+                    Context({'field': field})))
@@ -0,0 +1,119 @@
+import importlib
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .compat import unittest
+
+
+def run_python(code):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    return subprocess.check_output(
+        [sys.executable, '-c', code], env=env,
+        stderr=subprocess.STDOUT).decode()
+
+
+class LazyGisImportTests(SimpleTestCase):
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     'floppyforms.gis is imported eagerly on Python < 3.7')
+    def test_gis_is_not_imported_with_floppyforms(self):
+        output = run_python(
+            'import sys, floppyforms, floppyforms.__future__\n'
+            'print(sorted(name for name in sys.modules\n'
+            '             if name.startswith(("floppyforms.gis",\n'
+            '                                 "django.contrib.gis"))))')
+        self.assertEqual(output.strip().splitlines()[-1], '[]')
+
+    def test_gis_is_imported_on_access(self):
+        import floppyforms
+        import floppyforms.__future__
+        try:
+            gis = importlib.import_module('floppyforms.gis')
+        except Exception:
+            self.skipTest('GDAL / GEOS not installed')
+        self.assertIs(floppyforms.gis, gis)
+        self.assertIs(floppyforms.__future__.gis, gis)
+        self.assertTrue(hasattr(gis, 'PointWidget'))
+
+        # In a fresh interpreter, to go through the module's __getattr__.
+        output = run_python(
+            'import floppyforms, floppyforms.__future__\n'
+            'from floppyforms import gis\n'
+            'print(gis is floppyforms.gis is floppyforms.__future__.gis,\n'
+            '      floppyforms.gis.PointField.__name__)')
+        self.assertEqual(output.strip().splitlines()[-1], 'True PointField')
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     'floppyforms.gis is imported eagerly on Python < 3.7')
+    def test_gis_import_error(self):
+        # Blocks the import of floppyforms.gis, like a missing GDAL does.
+        output = run_python(
+            'import sys\n'
+            'sys.modules["floppyforms.gis"] = None\n'
+            'import floppyforms, floppyforms.__future__\n'
+            'print(hasattr(floppyforms, "gis"),\n'
+            '      hasattr(floppyforms.__future__, "gis"))')
+        self.assertEqual(output.strip().splitlines()[-1], 'False False')
+
+    def test_unknown_attribute(self):
+        import floppyforms
+        with self.assertRaises(AttributeError):
+            floppyforms.does_not_exist
+
+
+class ImportTimeTests(SimpleTestCase):
+    # The cumulative time of ``import floppyforms`` may be at most this many
+    # times the cumulative time of ``import django.forms`` in the same run.
+    # floppyforms imports django.forms, so it includes that time too. It's
+    # about 1.4 on a laptop, the budget only catches expensive work at module
+    # level or heavy imports sneaking in, independently of the machine speed.
+    import_time_ratio = 3
+
+    # Modules that must not be imported by ``import floppyforms``.
+    deferred_modules = (
+        'django.contrib.gis',
+        'floppyforms.gis',
+        'floppyforms.views',
+        'floppyforms.__future__',
+    )
+
+    def get_import_times(self):
+        """
+        Returns the cumulative import time of every module imported by
+        ``import floppyforms``, in microseconds.
+        """
+        # Runs without settings, importing floppyforms must not need them.
+        env = dict(os.environ)
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', 'import floppyforms'],
+            env=env, stderr=subprocess.STDOUT).decode()
+        times = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            self_time, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+        return times
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     '-X importtime is only available in Python 3.7+')
+    def test_import_time_budget(self):
+        times = self.get_import_times()
+        self.assertIn('floppyforms.widgets', times)
+        self.assertIn('django.forms', times)
+        self.assertLess(times['floppyforms'],
+                        self.import_time_ratio * times['django.forms'])
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     '-X importtime is only available in Python 3.7+')
+    def test_deferred_modules_are_not_imported(self):
+        for name in self.get_import_times():
+            for deferred in self.deferred_modules:
+                self.assertFalse(
+                    name == deferred or name.startswith(deferred + '.'),
+                    '%s is imported by "import floppyforms"' % name)
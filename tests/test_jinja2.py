@@ -0,0 +1,271 @@
+import datetime
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.forms.formsets import formset_factory
+from django.conf import settings
+from django.template import Context, Template, engines
+from django.test import TestCase
+from django.utils.safestring import SafeString
+
+import floppyforms as forms
+from floppyforms.templatetags.floppyforms import FormConfig
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+
+def render(template, context=None):
+    return engines['jinja2'].from_string(template).render(context or {})
+
+
+def render_django(template, context=None):
+    return Template('{% load floppyforms %}' + template).render(
+        Context(context or {}))
+
+
+class PersonForm(forms.Form):
+    firstname = forms.CharField()
+    lastname = forms.CharField(label='Last name:', label_suffix=' ->')
+    age = forms.IntegerField(help_text='In years.')
+    bio = forms.CharField(widget=forms.Textarea)
+    secret = forms.CharField(widget=forms.HiddenInput)
+
+
+class WidgetsForm(forms.Form):
+    city = forms.CharField(widget=forms.TextInput(
+        datalist=['Berlin', 'Paris']))
+    password = forms.CharField(widget=forms.PasswordInput)
+    number = forms.IntegerField(widget=forms.NumberInput(
+        attrs={'min': 1, 'autofocus': True}))
+    choice = forms.ChoiceField(choices=(
+        ('a', 'A'), ('Group', (('b', 'B'), ('c', 'C')))))
+    radio = forms.ChoiceField(choices=(('a', 'A'), ('b', 'B')),
+                              widget=forms.RadioSelect)
+    checkboxes = forms.MultipleChoiceField(
+        choices=(('a', 'A'), ('b', 'B')),
+        widget=forms.CheckboxSelectMultiple)
+    flag = forms.BooleanField(required=False)
+    date = forms.DateField(widget=forms.SelectDateWidget)
+    file_ = forms.FileField(required=False)
+    initial = forms.CharField(show_hidden_initial=True)
+
+
+@unittest.skipIf(jinja2 is None, 'jinja2 is not installed')
+class Jinja2LayoutTests(TestCase):
+    def test_layouts(self):
+        form = PersonForm(data={'firstname': 'Jane', 'age': 'x'})
+        form.add_error(None, 'Not a person.')
+        for layout in ('default', 'p', 'ul', 'table'):
+            template = '{%% form form using "floppyforms/layouts/%s.html" %%}'
+            self.assertHTMLEqual(
+                render(template % layout, {'form': form}),
+                render_django(template % layout, {'form': form}))
+
+    def test_form_render_as(self):
+        form = PersonForm()
+        self.assertHTMLEqual(
+            render('{{ form.as_p() }}', {'form': form}), form.as_p())
+
+    def test_jinja2_backend_first(self):
+        templates = list(reversed(settings.TEMPLATES))
+        form = PersonForm(data={'firstname': 'Jane'})
+        expected = form.as_p()
+        with self.settings(TEMPLATES=templates):
+            self.assertIsInstance(form['secret'].as_hidden(), SafeString)
+            self.assertHTMLEqual(form.as_p(), expected)
+
+            city = WidgetsForm()['city']
+            self.assertIn('<option value="Berlin">', str(city))
+
+    def test_django_overrides_with_jinja2_backend_first(self):
+        django_backend, jinja2_backend = settings.TEMPLATES
+        django_backend = dict(django_backend, APP_DIRS=False, OPTIONS=dict(
+            django_backend['OPTIONS'], loaders=[
+                ('django.template.loaders.locmem.Loader', {
+                    'floppyforms/text.html': 'custom {{ name }}',
+                }),
+                'django.template.loaders.app_directories.Loader',
+            ]))
+        with self.settings(TEMPLATES=[jinja2_backend, django_backend]):
+            self.assertEqual(forms.TextInput().render('name', ''),
+                             'custom name')
+            # The Jinja2 tags still use the Jinja2 templates.
+            self.assertNotIn('custom', render('{% formfield form.firstname %}',
+                                              {'form': PersonForm()}))
+
+        # Without other backends, the Jinja2 templates are used.
+        form = PersonForm(data={'firstname': 'Jane'})
+        expected = form.as_p()
+        with self.settings(TEMPLATES=[jinja2_backend]):
+            self.assertHTMLEqual(form.as_p(), expected)
+
+    def test_widgets(self):
+        form = WidgetsForm(initial={'choice': 'b', 'radio': 'a',
+                                    'checkboxes': ['a', 'b'], 'flag': True,
+                                    'date': datetime.date(2020, 1, 2),
+                                    'initial': 'foo'})
+        for field in form:
+            template = '{% formfield field %}'
+            self.assertHTMLEqual(
+                render(template, {'field': field}),
+                render_django(template, {'field': field}))
+
+        form = WidgetsForm(
+            data={'city': 'Paris', 'password': 'secret', 'number': '3'},
+            files={'file_': SimpleUploadedFile('a.txt', b'a')})
+        for field in form:
+            template = '{% formfield field %}'
+            self.assertHTMLEqual(
+                render(template, {'field': field}),
+                render_django(template, {'field': field}))
+
+
+@unittest.skipIf(jinja2 is None, 'jinja2 is not installed')
+class Jinja2FormTagTests(TestCase):
+    def test_invalid_syntax(self):
+        for template in ('{% form %}',
+                         '{% form myform using with foo=1 %}',
+                         '{% form myform with foo=1 %}',
+                         '{% form myform using only %}{% endform %}',
+                         '{% form myform using with foo=1 only %}'
+                         '{% endform %}',
+                         '{% formfield %}',
+                         '{% formfield myform.firstname myform.lastname %}',
+                         '{% formconfig row %}',
+                         '{% formconfig row with %}',
+                         '{% formconfig row using "row.html" for "spam" %}',
+                         '{% formconfig field with myarg="bar" only %}',
+                         '{% formconfig non_existent_modifier %}'):
+            with self.assertRaises(jinja2.TemplateSyntaxError):
+                render(template)
+
+    def test_inline_content(self):
+        self.assertHTMLEqual(render('''
+            {% form f1 nothing f2 using %}
+                {% if f1 == forms[0] and f2 == forms[1] and form == f1 %}
+                    Equals!
+                {% endif %}
+                Length: {{ forms|length }}
+            {% endform %}''', {'f1': PersonForm(), 'f2': PersonForm()}),
+            'Equals! Length: 2')
+
+    def test_include_content(self):
+        self.assertHTMLEqual(
+            render('{% form formset using "simple_form_tag.html" %}', {
+                'formset': formset_factory(PersonForm, extra=2)(),
+            }), """
+            Forms: 2
+            1. Form Fields: firstname lastname age bio secret
+            2. Form Fields: firstname lastname age bio secret
+            """)
+        self.assertHTMLEqual(
+            render('''{% set extra_argument = "ham" %}
+                {% form form using "simple_form_tag.html" %}''',
+                   {'form': PersonForm()}), """
+            Forms: 1
+            1. Form Fields: firstname lastname age bio secret
+            Extra argument: ham
+            """)
+        self.assertHTMLEqual(
+            render('''{% set extra_argument = "ham" %}
+                {% form form using "simple_form_tag.html" only %}''',
+                   {'form': PersonForm()}), """
+            Forms: 1
+            1. Form Fields: firstname lastname age bio secret
+            """)
+        self.assertHTMLEqual(
+            render('{% form form using "simple_form_tag.html" with '
+                   'extra_argument="spam" %}', {'form': PersonForm()}), """
+            Forms: 1
+            1. Form Fields: firstname lastname age bio secret
+            Extra argument: spam
+            """)
+
+    def test_formconfig(self):
+        form = PersonForm()
+        rendered = render('''{% form form using %}
+            {% formconfig row with extra_argument="first argument" %}
+            {% formrow form.firstname using "simple_formrow_tag.html" %}
+            {% form form using %}
+                {% formconfig row with extra_argument="pop me" %}
+                {% formrow form.lastname using "simple_formrow_tag.html" %}
+            {% endform %}
+            {% formrow form.lastname using "simple_formrow_tag.html" %}
+            {% formconfig field using "simple_formfield_tag.html" for "age" %}
+            {% formfield form.firstname %}
+            {% formfield form.age with extra_argument="eggs" %}
+        {% endform %}''', {'form': form})
+        self.assertHTMLEqual(rendered, '''
+        Fields: 1
+        1. Field: firstname Extra argument: first argument
+
+        Fields: 1
+        1. Field: lastname Extra argument: pop me
+
+        Fields: 1
+        1. Field: lastname Extra argument: first argument
+
+        <input type="text" name="firstname" id="id_firstname" required>
+        Type: number Widget: NumberInput Extra argument: eggs
+        ''')
+
+    def test_formconfig_outside_form(self):
+        with self.assertRaises(jinja2.TemplateRuntimeError):
+            render('{% formconfig row using "row.html" %}')
+
+    def test_change_widget(self):
+        form = PersonForm()
+        config = FormConfig()
+        config.configure('widget', forms.PasswordInput())
+        self.assertHTMLEqual(
+            render('{% formfield form.firstname %}', {
+                'form': form, '_form_config': config,
+            }), '<input type="password" name="firstname" id="id_firstname">')
+
+    def test_outer_scope(self):
+        self.assertHTMLEqual(render('''{% set extra_argument = "yepyep" %}
+            {% formfield form.firstname using "simple_formfield_tag.html" %}
+        ''', {'form': PersonForm()}),
+            'Type: text Widget: TextInput Extra argument: yepyep')
+        self.assertHTMLEqual(render('''{% set extra_argument = "yepyep" %}
+            {% formfield form.firstname using "simple_formfield_tag.html"
+                only %}
+        ''', {'form': PersonForm()}), 'Type: text Widget: TextInput')
+
+    def test_share_datalists(self):
+        class CityForm(forms.Form):
+            city = forms.CharField(widget=forms.TextInput(
+                datalist=['Berlin', 'Paris']))
+
+        CityFormSet = formset_factory(CityForm, extra=2)
+        self.assertHTMLEqual(render('''{% form formset using share_datalists %}
+            {% for form in forms %}{% formfield form.city %}{% endfor %}
+        {% endform %}''', {'formset': CityFormSet()}), '''
+            <input type="text" name="form-0-city" id="id_form-0-city" list="id_form-0-city_list" required>
+            <input type="text" name="form-1-city" id="id_form-1-city" list="id_form-0-city_list" required>
+            <datalist id="id_form-0-city_list">
+                <option value="Berlin">
+                <option value="Paris">
+            </datalist>
+        ''')
+
+        rendered = render('{% form formset using "floppyforms/layouts/p.html" '
+                          'share_datalists %}', {'formset': CityFormSet()})
+        self.assertEqual(rendered.count('<datalist'), 1)
+        self.assertEqual(rendered.count('list="id_form-0-city_list"'), 2)
+
+    def test_formerrors(self):
+        form = PersonForm(data={'age': 'x'})
+        form.add_error('firstname', 'Use <b>letters</b>.')
+        for name in ('firstname', 'age', 'bio'):
+            template = '{% formerrors errors %}'
+            context = {'errors': form[name].errors}
+            self.assertEqual(render(template, context),
+                             render_django(template, context))
+        with self.settings(FLOPPYFORMS_ERRORS_TEMPLATE='floppyforms/errors.html'):
+            self.assertHTMLEqual(
+                render('{% formerrors form.firstname.errors %}', {'form': form}),
+                render_django('{% formerrors form.firstname.errors %}', {'form': form}))
@@ -1,9 +1,14 @@
 import django
+from django import forms as django_forms
 from django.db import models
+from django.db.models.signals import class_prepared
 from django.test import TestCase
 
 import floppyforms.__future__ as forms
 from floppyforms.__future__.models import modelform_factory, modelformset_factory, inlineformset_factory
+from floppyforms.__future__.models import (
+    formfield_callback, cached_modelform_factory, cached_modelformset_factory,
+    factory_cache, FactoryCache)
 
 from .compat import unittest
 from .models import Registration, AllFields
@@ -213,3 +218,76 @@ class ModelMultipleChoiceFieldTests(TestCase):
         <input type="hidden" name="mods" value="1" id="id_mods_0">
         <input type="hidden" name="mods" value="2" id="id_mods_1">
         """)
+
+
+class FormfieldCallbackTests(TestCase):
+    def test_subclassed_model_field(self):
+        class NameField(models.CharField):
+            pass
+
+        class LongTextField(models.TextField):
+            pass
+
+        field = formfield_callback(NameField(max_length=10))
+        self.assertIsInstance(field, forms.CharField)
+        self.assertIsInstance(field.widget, forms.TextInput)
+
+        field = formfield_callback(LongTextField())
+        self.assertIsInstance(field, forms.CharField)
+        self.assertIsInstance(field.widget, forms.Textarea)
+
+    def test_subclass_with_own_formfield_is_left_alone(self):
+        class CodeField(models.CharField):
+            def formfield(self, **kwargs):
+                defaults = {'form_class': django_forms.SlugField}
+                defaults.update(kwargs)
+                return super(CodeField, self).formfield(**defaults)
+
+        field = formfield_callback(CodeField(max_length=10))
+        self.assertIs(field.__class__, django_forms.SlugField)
+
+
+class CachedFactoryTests(TestCase):
+    def setUp(self):
+        factory_cache.clear()
+
+    def test_modelform_factory_returns_same_class(self):
+        Form = cached_modelform_factory(Registration, fields=['firstname'])
+        self.assertIs(
+            cached_modelform_factory(Registration, fields=('firstname',)),
+            Form)
+        self.assertIsNot(
+            cached_modelform_factory(Registration, fields=['lastname']),
+            Form)
+        self.assertIsInstance(Form.base_fields['firstname'], forms.CharField)
+
+    def test_modelformset_factory_returns_same_class(self):
+        FormSet = cached_modelformset_factory(
+            Registration, fields=['age'], widgets={'age': forms.TextInput})
+        self.assertIs(cached_modelformset_factory(
+            Registration, fields=['age'], widgets={'age': forms.TextInput}),
+            FormSet)
+        self.assertIsNot(cached_modelformset_factory(
+            Registration, fields=['age'], extra=5), FormSet)
+
+    def test_unhashable_arguments_are_not_cached(self):
+        fields = {'firstname'}
+        Form = cached_modelform_factory(Registration, fields=fields)
+        self.assertIsNot(cached_modelform_factory(Registration, fields=fields),
+                         Form)
+
+    def test_cache_is_bounded(self):
+        cache = FactoryCache(maxsize=2)
+        for name in ('firstname', 'lastname', 'username'):
+            cache.get_or_create(modelform_factory, (Registration,),
+                                {'fields': [name]})
+        self.assertEqual(len(cache.classes), 2)
+
+    def test_cache_is_cleared_when_a_model_is_created(self):
+        Form = cached_modelform_factory(Registration, fields=['firstname'])
+        # Sent by ModelBase when a model class is created.
+        class_prepared.send(sender=Registration)
+
+        self.assertIsNot(
+            cached_modelform_factory(Registration, fields=['firstname']),
+            Form)
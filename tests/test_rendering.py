@@ -1,9 +1,12 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 
 import floppyforms as forms
 
 from floppyforms import widgets
-from floppyforms.templatetags.floppyforms import ConfigFilter, FormConfig
+from floppyforms.templatetags.floppyforms import (ConfigFilter, ConfigPopException,
+                                                  FormConfig)
 
 
 class AgeField(forms.IntegerField):
@@ -225,3 +228,87 @@ class FormConfigTests(TestCase):
         self.assertEqual(list(config.retrieve_all('number')), [2, 1])
         self.assertEqual(list(config.retrieve_all('number', nr='four')), [4, 2, 1])
         self.assertEqual(list(config.retrieve_all('number', nr='five')), [2, 1])
+
+    def test_lazy_frames(self):
+        form = RegistrationForm()
+        config = FormConfig()
+        config.push()
+        config.push()
+        self.assertEqual(config.dicts, [None, None, None])
+
+        config.retrieve('widget', bound_field=form['name'])
+        config.retrieve_all('widget_context', bound_field=form['name'])
+        self.assertEqual(config.dicts, [None, None, None])
+
+        config.configure('label', 'Name')
+        self.assertEqual(config.retrieve('label'), 'Name')
+        config.retrieve('widget', bound_field=form['name'])
+        self.assertEqual(list(config.dicts[-1].keys()), ['label'])
+
+        self.assertIsNotNone(config.pop())
+        self.assertIsNone(config.pop())
+        with self.assertRaises(ConfigPopException):
+            config.pop()
+
+    def test_memoized_resolution(self):
+        forms_ = [RegistrationForm(prefix='form-%d' % i) for i in range(3)]
+        config = FormConfig()
+        config.configure('widget_template', 'email.html',
+                         filter=ConfigFilter('EmailField'))
+        config.push()
+        version = config.version
+        config.configure('widget_context', {'foo': 1},
+                         filter=ConfigFilter('CharField'))
+        self.assertNotEqual(config.version, version)
+
+        calls = []
+        original_call = ConfigFilter.__call__
+
+        def call(self, bound_field):
+            calls.append(bound_field.name)
+            return original_call(self, bound_field)
+
+        with patch.object(ConfigFilter, '__call__', call):
+            for form in forms_:
+                for bound_field in form:
+                    config.retrieve('widget_template', bound_field=bound_field)
+                    config.retrieve_all('widget_context',
+                                        bound_field=bound_field)
+        # The filters ran for the first form only.
+        self.assertEqual(len(calls), 2 * len(forms_[0].fields))
+
+        form = forms_[1]
+        self.assertEqual(
+            config.retrieve('widget_template', bound_field=form['email']),
+            'email.html')
+        self.assertEqual(
+            config.retrieve_all('widget_context', bound_field=form['name']),
+            [{'foo': 1}])
+        self.assertEqual(
+            config.retrieve_all('widget_context', bound_field=form['age']),
+            [])
+        # Defaults come from the bound field itself.
+        self.assertEqual(
+            config.retrieve('widget_template', bound_field=form['name']),
+            form.fields['name'].widget.template_name)
+        self.assertIs(config.retrieve('widget', bound_field=form['name']),
+                      form.fields['name'].widget)
+
+        config.pop()
+        self.assertEqual(config.version, version)
+        self.assertEqual(
+            config.retrieve_all('widget_context', bound_field=form['name']),
+            [])
+
+    def test_bound_field_filters_are_not_memoized(self):
+        form1 = RegistrationForm(prefix='form-1')
+        form2 = RegistrationForm(prefix='form-2')
+        config = FormConfig()
+        config.configure('widget_template', 'name.html',
+                         filter=ConfigFilter(form1['name']))
+        self.assertEqual(
+            config.retrieve('widget_template', bound_field=form1['name']),
+            'name.html')
+        self.assertEqual(
+            config.retrieve('widget_template', bound_field=form2['name']),
+            form2.fields['name'].widget.template_name)
@@ -1,3 +1,8 @@
+import gc
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
 import django
 from django.forms import TextInput
 from django.forms.formsets import formset_factory
@@ -6,8 +11,12 @@ from django.test import TestCase
 
 import floppyforms as forms
 from floppyforms.templatetags.floppyforms import (FormConfig, ConfigFilter,
-                                                  FormNode, RowModifier,
-                                                  FieldModifier)
+                                                  FormNode, FormRow,
+                                                  RowModifier, FieldModifier,
+                                                  accepts_render_parameters,
+                                                  attributes,
+                                                  hidden_field_errors,
+                                                  render_widget, top_errors)
 
 
 _TEMPLATE_PREAMBLE = '{% load floppyforms %}'
@@ -457,6 +466,59 @@ class FormTagTests(TestCase):
             5. Form Fields: firstname lastname age bio
             """)
 
+    def test_share_datalists(self):
+        class CityForm(forms.Form):
+            city = forms.CharField(widget=forms.TextInput(
+                datalist=['Berlin', 'Paris']))
+
+        CityFormSet = formset_factory(CityForm, extra=2)
+        rendered = render('''{% form formset using share_datalists %}
+            {% for form in forms %}{% formfield form.city %}{% endfor %}
+        {% endform %}''', {'formset': CityFormSet()})
+        self.assertHTMLEqual(rendered, '''
+            <input type="text" name="form-0-city" id="id_form-0-city" list="id_form-0-city_list" required>
+            <input type="text" name="form-1-city" id="id_form-1-city" list="id_form-0-city_list" required>
+            <datalist id="id_form-0-city_list">
+                <option value="Berlin">
+                <option value="Paris">
+            </datalist>
+        ''')
+
+        rendered = render('{% form formset using "floppyforms/layouts/p.html" share_datalists %}', {
+            'formset': CityFormSet(),
+        })
+        self.assertEqual(rendered.count('<datalist'), 1)
+        self.assertEqual(rendered.count('list="id_form-0-city_list"'), 2)
+
+    def test_share_datalists_twice_on_a_page(self):
+        class CityForm(forms.Form):
+            city = forms.CharField(widget=forms.TextInput(
+                datalist=['Berlin', 'Paris']))
+
+        CityFormSet = formset_factory(CityForm, extra=1)
+        rendered = render('''
+            {% form departures using share_datalists %}
+                {% for form in forms %}{% formfield form.city %}{% endfor %}
+            {% endform %}
+            {% form arrivals using share_datalists %}
+                {% for form in forms %}{% formfield form.city %}{% endfor %}
+            {% endform %}''', {
+            'departures': CityFormSet(prefix='departures'),
+            'arrivals': CityFormSet(prefix='arrivals'),
+        })
+        self.assertHTMLEqual(rendered, '''
+            <input type="text" name="departures-0-city" id="id_departures-0-city" list="id_departures-0-city_list" required>
+            <datalist id="id_departures-0-city_list">
+                <option value="Berlin">
+                <option value="Paris">
+            </datalist>
+            <input type="text" name="arrivals-0-city" id="id_arrivals-0-city" list="id_arrivals-0-city_list" required>
+            <datalist id="id_arrivals-0-city_list">
+                <option value="Berlin">
+                <option value="Paris">
+            </datalist>
+        ''')
+
     def test_formconfig_gets_popped_after_form_tag(self):
         form = PersonForm()
         rendered = render('''{% form form using %}
@@ -519,6 +581,29 @@ class FormRowTagTests(TestCase):
         with self.assertRaises(TemplateSyntaxError):
             render('{% formrow myform.name using %}{% endform %}')
 
+    def test_form_row(self):
+        class RowForm(forms.Form):
+            name = forms.CharField(label='Name & nick')
+            email = forms.EmailField(label='Email?', required=False)
+            age = forms.IntegerField(label_suffix=' =', widget=forms.NumberInput(attrs={'id': 'age'}))
+
+        form = RowForm(data={'age': 'x'}, auto_id='f_%s', label_suffix='#')
+        row = FormRow(form['name'])
+        self.assertEqual(row.label_id, 'f_name')
+        self.assertEqual(row.label_with_suffix, 'Name &amp; nick#')
+        self.assertEqual(row.classes, '')
+        self.assertEqual(FormRow(form['email']).label_with_suffix, 'Email?')
+        row = FormRow(form['age'], label='Years')
+        self.assertEqual(row.label_id, 'age')
+        self.assertEqual(row.label_with_suffix, 'Years =')
+        form.fields['age'].widget.attrs['id'] = 'other'
+        self.assertEqual(row.label_id, 'age')
+
+        self.assertHTMLEqual(render('{% formrow form.name with label="Nick" %}', {'form': form}), """
+            <ul class="errorlist"><li>This field is required.</li></ul>
+            <p><label for="f_name">Nick#</label>
+            <input type="text" name="name" id="f_name" required></p>""")
+
     def test_include_content(self):
         with self.assertTemplateUsed('simple_formrow_tag.html'):
             self.assertHTMLEqual(
@@ -745,6 +830,118 @@ class FormFieldTagTests(TestCase):
             {% formfield form.name %}
         {% endform %}""", {'myform': form}), """Hardcoded widget.""")
 
+    def test_widget_is_not_modified(self):
+        class DjangoWidgetForm(forms.Form):
+            name = forms.CharField(widget=TextInput)
+
+        for form in (SimpleForm(), DjangoWidgetForm()):
+            widget = form.fields['name'].widget
+            attributes = dict(widget.__dict__)
+            render("""{% form myform using %}
+                {% formconfig field using "simple_formfield_tag.html" %}
+                {% formfield form.name with extra_argument="spam" %}
+            {% endform %}""", {'myform': form})
+            self.assertEqual(widget.__dict__, attributes)
+
+    def test_context_is_not_retained(self):
+        class Sentinel(object):
+            pass
+
+        class FailingWidget(forms.TextInput):
+            def get_context(self, *args, **kwargs):
+                raise ValueError
+
+        form = SimpleForm()
+        for widget in (TextInput(), forms.TextInput(), FailingWidget()):
+            config = FormConfig()
+            config.configure('widget', widget)
+            sentinel = Sentinel()
+            reference = weakref.ref(sentinel)
+            context = Context({'myform': form, 'sentinel': sentinel})
+            dicts = len(context.dicts)
+            try:
+                render("""{% form myform using %}
+                    {% formconfig field using "simple_formfield_tag.html" %}
+                    {% formfield form.name with extra_argument=sentinel %}
+                {% endform %}""", context, config)
+            except ValueError:
+                self.assertIsInstance(widget, FailingWidget)
+            self.assertEqual(len(context.dicts), dicts)
+            self.assertEqual(len(config.dicts), 1)
+            del sentinel, context
+            gc.collect()
+            self.assertIsNone(reference())
+
+    def test_attributes_are_restored(self):
+        widget = TextInput()
+        widget.template_name = 'custom.html'
+        with self.assertRaises(ValueError), \
+                self.assertWarns(DeprecationWarning):
+            with attributes(widget, template_name='other.html',
+                            context_instance=Context()):
+                self.assertEqual(widget.template_name, 'other.html')
+                raise ValueError
+        self.assertEqual(widget.template_name, 'custom.html')
+        self.assertFalse(hasattr(widget, 'context_instance'))
+
+    def test_render_widget(self):
+        class KwargsTextInput(forms.TextInput):
+            def render(self, name, value, attrs=None, **kwargs):
+                # Doesn't pass the render parameters on.
+                return super(KwargsTextInput, self).render(name, value, attrs)
+
+        class LocalizedForm(forms.Form):
+            name = forms.CharField(widget=KwargsTextInput)
+            number = forms.FloatField(localize=True)
+
+        form = LocalizedForm()
+        self.assertFalse(accepts_render_parameters(form.fields['name'].widget))
+        self.assertTrue(accepts_render_parameters(forms.PasswordInput()))
+        self.assertHTMLEqual(
+            render_widget(form['name'], form.fields['name'].widget,
+                          template_name='simple_formfield_tag.html'),
+            'Type: text')
+
+        widget = forms.NumberInput()
+        render_widget(form['number'], widget)
+        self.assertFalse(widget.is_localized)
+
+    def test_concurrent_rendering(self):
+        class SlowTextInput(forms.TextInput):
+            def get_context(self, *args, **kwargs):
+                # Let the other threads run in the middle of rendering.
+                time.sleep(0.001)
+                return super(SlowTextInput, self).get_context(*args,
+                                                              **kwargs)
+
+        class SlowForm(forms.Form):
+            name = forms.CharField(widget=SlowTextInput)
+
+        form = SlowForm()
+        template = Template(_TEMPLATE_PREAMBLE + """{% form form using %}
+            {% formconfig field using template with extra_argument=argument %}
+            {% formfield form.name %}
+        {% endform %}""")
+
+        def render_form(i):
+            return template.render(Context({
+                'form': form,
+                'template': 'simple_formfield_tag.html' if i % 2 else
+                            'floppyforms/text.html',
+                'argument': i,
+            }))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for i, rendered in enumerate(executor.map(render_form,
+                                                      range(40))):
+                if i % 2:
+                    self.assertHTMLEqual(rendered,
+                                         'Type: text Extra argument: %d' % i)
+                else:
+                    self.assertHTMLEqual(rendered, """
+                        <input type="text" name="name" id="id_name" required>
+                    """)
+
     def test_formconfig_gets_popped_after_formfield_tag(self):
         '''
         Tests that the form config will be reseted after being set in a
@@ -784,3 +981,96 @@ class WidgetTagTest(TestCase):
 
         with self.assertRaises(TemplateSyntaxError):
             render("""{% widget stuff 12 %}""")
+
+
+class FormErrorsTagTest(TestCase):
+    def test_native_rendering(self):
+        form = PersonForm(data={'age': 'x'})
+        form.add_error('firstname', 'Use <b>letters</b>.')
+        for name in ('firstname', 'lastname', 'age', 'bio'):
+            context = {'errors': form[name].errors}
+            self.assertEqual(
+                render('{% formerrors errors %}', context),
+                render('{% include "floppyforms/errors.html" %}', context).strip())
+        self.assertIn('Use &lt;b&gt;letters&lt;/b&gt;.',
+                      render('{% formerrors errors %}',
+                             {'errors': form['firstname'].errors}))
+        self.assertEqual(render('{% formerrors errors %}', {'errors': []}), '')
+        self.assertEqual(render('{% formerrors nothing %}'), '')
+
+        with self.assertRaises(TemplateSyntaxError):
+            render('{% formerrors %}')
+
+    def test_errors_template_setting(self):
+        form = PersonForm(data={})
+        with self.settings(FLOPPYFORMS_ERRORS_TEMPLATE='custom_errors.html'):
+            self.assertHTMLEqual(
+                render('{% formerrors form.firstname.errors %}', {'form': form}),
+                '<span class="error">This field is required.</span>')
+            self.assertHTMLEqual(
+                render('{% formrow form.firstname %}', {'form': form}), """
+                <span class="error">This field is required.</span>
+                <p>
+                    <label for="id_firstname">Firstname:</label>
+                    <input type="text" name="firstname" id="id_firstname" required>
+                </p>""")
+
+    def test_overridden_errors_template(self):
+        form = PersonForm(data={})
+        with self.settings(TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'OPTIONS': {'loaders': [
+                ('django.template.loaders.locmem.Loader', {
+                    'floppyforms/errors.html':
+                        '{% for error in errors %}'
+                        '<span class="error">{{ error }}</span>'
+                        '{% endfor %}',
+                }),
+                'django.template.loaders.app_directories.Loader',
+            ]},
+        }]):
+            self.assertHTMLEqual(
+                render('{% formrow form.firstname %}', {'form': form}), """
+                <span class="error">This field is required.</span>
+                <p>
+                    <label for="id_firstname">Firstname:</label>
+                    <input type="text" name="firstname" id="id_firstname" required>
+                </p>""")
+
+
+class TopErrorsTest(TestCase):
+    class HiddenForm(forms.Form):
+        name = forms.CharField()
+        token = forms.CharField(widget=forms.HiddenInput)
+
+    def test_top_errors(self):
+        form = self.HiddenForm(data={'name': 'x'})
+        form.add_error(None, 'Not valid.')
+        self.assertEqual(top_errors(form),
+                         ['Not valid.', 'This field is required.'])
+        self.assertEqual(form.non_field_errors(), ['Not valid.'])
+        self.assertHTMLEqual(render('{% form form using "floppyforms/layouts/p.html" %}',
+                                    {'form': form}).split('<p>')[0], """
+            <ul class="errorlist">
+                <li>Not valid.</li>
+                <li>This field is required.</li>
+            </ul>""")
+
+    def test_hidden_field_errors_memo(self):
+        form = self.HiddenForm(data={})
+        calls = []
+        hidden_fields = form.hidden_fields
+
+        def counting_hidden_fields():
+            calls.append(1)
+            return hidden_fields()
+
+        form.hidden_fields = counting_hidden_fields
+        render('{% form form using %}{{ form|hidden_field_errors }}'
+               '{{ form|hidden_field_errors }}{% endform %}', {'form': form})
+        self.assertEqual(len(calls), 1)
+
+        # Outside of a form tag every call sees the current errors.
+        self.assertEqual(len(hidden_field_errors(form)), 1)
+        form.add_error('token', 'Again.')
+        self.assertEqual(len(hidden_field_errors(form)), 2)
@@ -0,0 +1,52 @@
+import json
+
+from django.test import RequestFactory, TestCase
+
+import floppyforms as forms
+from floppyforms.views import ModelChoicesView
+
+from .models import Registration
+
+
+class ModelChoicesViewTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        for name in ('Ada', 'Bob', 'Cid', 'Dan', 'Eve'):
+            Registration.objects.create(firstname=name, lastname=name,
+                                        username=name.lower(), age=30)
+
+    def get(self, view, **params):
+        response = view(self.factory.get('/', params))
+        return response.status_code, json.loads(response.content.decode())
+
+    def test_pages_follow_keys(self):
+        field = forms.ModelChoiceField(
+            queryset=Registration.objects.all(), to_field_name='username')
+        field.label_from_instance = lambda obj: obj.firstname
+        view = ModelChoicesView.as_view(field=field, paginate_by=2)
+
+        status, data = self.get(view)
+        self.assertEqual(status, 200)
+        self.assertEqual(data, {
+            'results': [{'value': 'ada', 'label': 'Ada'},
+                        {'value': 'bob', 'label': 'Bob'}],
+            'next': 'bob',
+        })
+
+        status, data = self.get(view, after='dan')
+        self.assertEqual(data, {
+            'results': [{'value': 'eve', 'label': 'Eve'}],
+            'next': None,
+        })
+
+    def test_queryset_and_limit(self):
+        view = ModelChoicesView.as_view(
+            queryset=Registration.objects.filter(age=30), max_paginate_by=3)
+        status, data = self.get(view, limit=100)
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data['next'], data['results'][-1]['value'])
+
+    def test_invalid_after(self):
+        view = ModelChoicesView.as_view(queryset=Registration.objects.all())
+        status, data = self.get(view, after='not-a-pk')
+        self.assertEqual(status, 400)
@@ -2,6 +2,7 @@ import datetime
 import decimal
 import os
 import sys
+from unittest.mock import patch
 
 import django
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -15,6 +16,7 @@ from django.utils.dates import MONTHS
 from django.utils.timezone import now
 
 import floppyforms as forms
+from floppyforms import compat
 
 from .base import InvalidVariable
 from .compat import force_str
@@ -689,6 +691,29 @@ class WidgetRenderingTest(TestCase):
             </select>
         </p>""")
 
+    def test_select_selected_values(self):
+        widget = forms.SelectMultiple(choices=(
+            (1, 'One'),
+            ('Group', ((2, 'Two'), (3, 'Three'))),
+        ))
+        context = widget.get_context('num', [1, '3'], {})
+        self.assertEqual(context['optgroups'], [
+            (None, [('1', 'One')]),
+            ('Group', [('2', 'Two'), ('3', 'Three')]),
+        ])
+        self.assertEqual(context['optgroups_selected'], [
+            (None, [('1', 'One', True)]),
+            ('Group', [('2', 'Two', False), ('3', 'Three', True)]),
+        ])
+
+    def test_null_boolean_select_selected_option(self):
+        widget = forms.NullBooleanSelect()
+        context = widget.get_context('answer', True, {})
+        self.assertEqual(context['optgroups_selected'], [
+            (None, [('1', 'Unknown', False), ('2', 'Yes', True),
+                    ('3', 'No', False)]),
+        ])
+
     def test_cb_multiple(self):
         """CheckboxSelectMultiple"""
         CHOICES = (
@@ -977,6 +1002,71 @@ class WidgetRenderingTest(TestCase):
             </select>
         </p>""")
 
+    def test_windowed_select(self):
+        for i in range(1, 6):
+            SomeModel.objects.create(some_field='Item %s' % i)
+
+        class WindowedForm(forms.Form):
+            mod = forms.ModelChoiceField(
+                queryset=SomeModel.objects.all(),
+                widget=forms.WindowedSelect(window_size=2,
+                                            choices_url='/choices/'))
+
+        rendered = WindowedForm().as_p()
+        self.assertHTMLEqual(rendered, """
+        <p>
+            <label for="id_mod">Mod:</label>
+            <select name="mod" id="id_mod" data-choices-url="/choices/" required>
+                <option value="">---------</option>
+                <option value="1">Item 1</option>
+                <option value="2">Item 2</option>
+            </select>
+        </p>""")
+
+        rendered = WindowedForm(data={'mod': 4}).as_p()
+        self.assertHTMLEqual(rendered, """
+        <p>
+            <label for="id_mod">Mod:</label>
+            <select name="mod" id="id_mod" data-choices-url="/choices/" required>
+                <option value="">---------</option>
+                <option value="4" selected>Item 4</option>
+                <option value="1">Item 1</option>
+                <option value="2">Item 2</option>
+            </select>
+        </p>""")
+
+        # A selected option in the window keeps its place.
+        rendered = WindowedForm(data={'mod': 2}).as_p()
+        self.assertHTMLEqual(rendered, """
+        <p>
+            <label for="id_mod">Mod:</label>
+            <select name="mod" id="id_mod" data-choices-url="/choices/" required>
+                <option value="">---------</option>
+                <option value="1">Item 1</option>
+                <option value="2" selected>Item 2</option>
+            </select>
+        </p>""")
+
+        form = WindowedForm(data={'mod': 'invalid'})
+        self.assertFalse(form.is_valid())
+        self.assertNotIn('selected', form.as_p())
+
+        class WindowedMultipleForm(forms.Form):
+            mods = forms.ModelMultipleChoiceField(
+                queryset=SomeModel.objects.all(),
+                widget=forms.WindowedSelectMultiple(window_size=2))
+
+        rendered = WindowedMultipleForm(data={'mods': [2, 5]}).as_p()
+        self.assertHTMLEqual(rendered, """
+        <p>
+            <label for="id_mods">Mods:</label>
+            <select name="mods" id="id_mods" multiple required>
+                <option value="5" selected>Item 5</option>
+                <option value="1">Item 1</option>
+                <option value="2" selected>Item 2</option>
+            </select>
+        </p>""")
+
     def test_combo_field(self):
         """Combo field"""
         class ComboForm(forms.Form):
@@ -1106,6 +1196,20 @@ class WidgetRenderingTest(TestCase):
         rendered = SelectDateForm().as_p()
         self.assertEqual(rendered.count('<option value="0">---</option>'), 3)
 
+    @override_settings(USE_L10N=False)
+    def test_select_date_widget_value_from_datadict(self):
+        widget = forms.SelectDateWidget()
+        data = {
+            'a-dt_year': '2020', 'a-dt_month': '2', 'a-dt_day': '3',
+            'b-dt_year': '2021', 'b-dt_month': '4', 'b-dt_day': '5',
+        }
+        self.assertEqual(widget.value_from_datadict(data, {}, 'a-dt'),
+                         '2020-2-3')
+        self.assertEqual(widget.value_from_datadict(data, {}, 'b-dt'),
+                         '2021-4-5')
+        self.assertEqual(widget.value_from_datadict(data, {}, 'a-dt'),
+                         '2020-2-3')
+
     def test_no_attrs_rendering(self):
         widget = forms.TextInput()
         try:
@@ -1281,6 +1385,46 @@ class WidgetRenderingTest(TestCase):
             </datalist>
         </p>""")
 
+    def test_datalist_options_are_cached(self):
+        class Form(forms.Form):
+            foo = forms.CharField(widget=forms.TextInput(
+                datalist=['Foo', 'Bar'],
+            ))
+
+        first, second = Form(), Form()
+        self.assertIsNot(first.fields['foo'].widget,
+                         second.fields['foo'].widget)
+        first.as_p()
+        with patch('floppyforms.widgets.render_to_string',
+                   wraps=compat.render_to_string) as render:
+            second.as_p()
+        rendered_templates = [call[0][0] for call in render.call_args_list]
+        self.assertNotIn('floppyforms/datalist_options.html',
+                         rendered_templates)
+
+        widget = Form.base_fields['foo'].widget
+        widget.datalist = ['Baz']
+        self.assertHTMLEqual(widget.render_datalist_options(),
+                             '<option value="Baz">')
+
+    def test_shared_datalist(self):
+        class Form(forms.Form):
+            foo = forms.CharField(widget=forms.TextInput(
+                datalist=['Foo', 'Bar'], datalist_id='foo_list',
+            ))
+
+        form = Form()
+        self.assertHTMLEqual(form.as_p(), """
+        <p>
+            <label for="id_foo">Foo:</label>
+            <input type="text" name="foo" required id="id_foo" list="foo_list">
+        </p>""")
+        self.assertHTMLEqual(form.fields['foo'].widget.render_datalist(), """
+        <datalist id="foo_list">
+            <option value="Foo">
+            <option value="Bar">
+        </datalist>""")
+
     def test_specify_template_at_init(self):
         """Can customize the template used when instantiating the widget."""
         widget = forms.TextInput(template_name='custom.html')
@@ -1306,6 +1450,21 @@ class WidgetRenderingTest(TestCase):
         self.assertHTMLEqual(
             rendered, '<input type="text" name="text" value="value" />')
 
+    def test_render_parameters(self):
+        """Render parameters don't modify the widget."""
+        widget = forms.TextInput(datalist=['Foo'])
+        context = Context({'extra_argument': 'outer'})
+        rendered = widget.render('text', 'value',
+                                 template_name='simple_formfield_tag.html',
+                                 context_instance=context)
+        self.assertHTMLEqual(rendered, 'Type: text Extra argument: outer')
+        rendered = widget.render('text', 'value', datalist_id='foo_list')
+        self.assertHTMLEqual(rendered, """
+            <input type="text" name="text" value="value" list="foo_list">""")
+        self.assertEqual(widget.template_name, 'floppyforms/text.html')
+        self.assertIsNone(widget.context_instance)
+        self.assertIsNone(widget.datalist_id)
+
 
 class WidgetRenderingTestWithTemplateStringIfInvalidSet(WidgetRenderingTest):
     pass